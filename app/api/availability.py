@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_db
+from app.models.simple import User as UserModel
+from app.schemas.availability import Availability, TimeSlot
+from app.services.availability_service import free_slots, parse_slot
+from app.services.busy_cache_service import busy_runs, load_busy_bits
+
+router = APIRouter()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Stored times are naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/{user_id}", response_model=Availability)
+async def get_availability(
+    user_id: int,
+    start: datetime = Query(..., description="Start of the range; naive values are UTC"),
+    end: datetime = Query(..., description="End of the range; naive values are UTC"),
+    slot: str = Query("30m", description="Slot length such as 15m, 30m or 1h"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get free slots within the user's working hours across all active calendars"""
+    user = await db.get(UserModel, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    try:
+        slot_length = parse_slot(slot)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    
+    start, end = _as_utc(start), _as_utc(end)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+    if (end - start).days > settings.availability_max_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range cannot exceed {settings.availability_max_days} days"
+        )
+    
+    # Whole UTC days of cached busy bitmaps covering the range
+    first_day = start.date()
+    busy_starts, busy_ends = busy_runs(
+        await load_busy_bits(db, user_id, first_day, (end - timedelta(microseconds=1)).date()), first_day
+    )
+    slots = free_slots(busy_starts, busy_ends, start, end, user.timezone or "UTC", slot_length)
+    
+    return Availability(
+        user_id=user_id,
+        timezone=user.timezone or "UTC",
+        start=start,
+        end=end,
+        slot_minutes=int(slot_length.total_seconds() // 60),
+        busy_intervals=len(busy_starts),
+        free_slots=[TimeSlot(start=slot_start, end=slot_end) for slot_start, slot_end in slots]
+    )
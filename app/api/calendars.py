@@ -1,10 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.simple import Calendar as CalendarModel
 from app.schemas.calendar import Calendar, CalendarCreate, CalendarUpdate
+from app.services.busy_cache_service import invalidate_busy_days
+from app.tasks.calendar_sync import enqueue_user_sync
+from app.utils.http_cache import etag_matches, make_etag, not_modified
 
 router = APIRouter()
 
@@ -33,20 +40,36 @@ def create_calendar(calendar: CalendarCreate, user_id: int, db: Session = Depend
 
 
 @router.get("/", response_model=List[Calendar])
-def get_calendars(user_id: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_calendars(
+    response: Response,
+    user_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get calendars, optionally filtered by user"""
-    query = db.query(CalendarModel)
+    query = select(CalendarModel)
     if user_id:
-        query = query.filter(CalendarModel.user_id == user_id)
+        query = query.where(CalendarModel.user_id == user_id)
     
-    calendars = query.offset(skip).limit(limit).all()
+    # Any change to the matching calendars moves their count or latest updated_at
+    count, last_updated = (await db.execute(
+        query.with_only_columns(func.count(), func.max(CalendarModel.updated_at))
+    )).one()
+    etag = make_etag("calendars", user_id, skip, limit, count, last_updated)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    calendars = (await db.scalars(query.offset(skip).limit(limit))).all()
     return calendars
 
 
 @router.get("/{calendar_id}", response_model=Calendar)
-def get_calendar(calendar_id: int, db: Session = Depends(get_db)):
+async def get_calendar(calendar_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific calendar by ID"""
-    db_calendar = db.query(CalendarModel).filter(CalendarModel.id == calendar_id).first()
+    db_calendar = await db.get(CalendarModel, calendar_id)
     if not db_calendar:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,6 +92,13 @@ def update_calendar(calendar_id: int, calendar_update: CalendarUpdate, db: Sessi
     for field, value in update_data.items():
         setattr(db_calendar, field, value)
     
+    # Activating or deactivating a calendar changes every day of its owner's busy time
+    # and adds or removes all of its copies in the master calendar
+    if "is_active" in update_data:
+        for stmt in invalidate_busy_days(calendar_id, None):
+            db.execute(stmt)
+        db_calendar.settings_changed_at = datetime.utcnow()
+    
     db.commit()
     db.refresh(db_calendar)
     return db_calendar
@@ -84,21 +114,29 @@ def delete_calendar(calendar_id: int, db: Session = Depends(get_db)):
             detail="Calendar not found"
         )
     
+    for stmt in invalidate_busy_days(calendar_id, None):
+        db.execute(stmt)
     db.delete(db_calendar)
     db.commit()
     return {"message": "Calendar deleted successfully"}
 
 
-@router.post("/{calendar_id}/sync")
-def sync_calendar(calendar_id: int, db: Session = Depends(get_db)):
-    """Trigger manual calendar sync"""
-    db_calendar = db.query(CalendarModel).filter(CalendarModel.id == calendar_id).first()
+@router.post("/{calendar_id}/sync", status_code=status.HTTP_202_ACCEPTED)
+async def sync_calendar(calendar_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Queue a manual calendar sync on the background workers"""
+    db_calendar = await db.get(CalendarModel, calendar_id)
     if not db_calendar:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Calendar not found"
         )
     
-    # This would trigger a background task to sync the calendar
-    # For now, just return a success message
-    return {"message": f"Sync triggered for calendar {calendar_id}", "status": "initiated"}
\ No newline at end of file
+    if db_calendar.is_master:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The master calendar is built from source calendars and cannot be synced"
+        )
+    
+    # Publishing to the broker is blocking I/O
+    result = await run_in_threadpool(enqueue_user_sync, db_calendar.user_id, [calendar_id])
+    return {"message": f"Sync triggered for calendar {calendar_id}", "status": "initiated", "task_id": result.id}
@@ -1,66 +1,250 @@
+import json
+import logging
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, date
 
-from app.database import get_db
-from app.models.simple import Event as EventModel
-from app.schemas.event import Event, EventCreate, EventUpdate, EventList
+from app.database import AsyncSessionLocal, get_async_db, get_db
+from app.models.simple import Calendar as CalendarModel, Conflict as ConflictModel, Event as EventModel, EventOrigin
+from app.schemas.event import Event, EventCreate, EventUpdate, EventList, EventConflict
+from app.services.busy_cache_service import changed_days, invalidate_busy_days
+from app.services.conflict_service import (
+    clear_event_conflicts,
+    rebuild_user_conflicts,
+    refresh_event_conflicts,
+    scoped_calendar_ids,
+)
+from app.services.event_count_service import adjust_event_count
+from app.services.event_import_service import import_events, iter_lines, parse_ics, parse_ndjson
+from app.services.recurrence_service import UnknownTimezoneError, validate_rule
+from app.services.sync_service import record_event_deletion, retire_master_copies
+from app.tasks.calendar_sync import enqueue_user_projection
+from app.utils.http_cache import etag_matches, make_etag, not_modified
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Fields that change where an event is busy
+BUSY_FIELDS = {"start_time", "end_time", "timezone", "is_all_day", "recurrence_rule"}
+
+IMPORT_PARSERS = {"ndjson": parse_ndjson, "ics": parse_ics}
+
+
+class _ImportProgressResponse(StreamingResponse):
+    """Streams progress while the request body is still being read.
+
+    StreamingResponse listens for a disconnect by reading from ``receive``,
+    which would swallow the body chunks the import consumes; a client that
+    goes away shows up as ClientDisconnect from ``request.stream()`` instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+def _check_recurrence_rule(rule: Optional[str], start_time: datetime, timezone: str, is_all_day: bool) -> None:
+    if rule is None:
+        return
+    try:
+        validate_rule(rule, start_time, None if is_all_day else timezone)
+    except UnknownTimezoneError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc)
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recurrence rule: {exc}"
+        )
+
+
+def _check_not_master_copy(db_event: EventModel) -> None:
+    if db_event.origin == EventOrigin.MASTER_COPY:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Master copies follow their source events; change the source event instead"
+        )
+
 
 @router.post("/", response_model=Event, status_code=status.HTTP_201_CREATED)
 def create_event(event: EventCreate, db: Session = Depends(get_db)):
     """Create a new event"""
-    db_event = EventModel(**event.dict())
+    is_master = db.query(CalendarModel.is_master).filter(CalendarModel.id == event.calendar_id).scalar()
+    if is_master:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The master calendar is a projection and cannot be written to directly"
+        )
+    _check_recurrence_rule(event.recurrence_rule, event.start_time, event.timezone, event.is_all_day)
+    db_event = EventModel(**event.dict(), is_recurring=event.recurrence_rule is not None)
     db.add(db_event)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Event with this provider_event_id already exists in the calendar"
+        )
+    refresh_event_conflicts(db, db_event)
+    db.execute(adjust_event_count(db_event.calendar_id, 1))
+    for stmt in invalidate_busy_days(db_event.calendar_id, changed_days([db_event])):
+        db.execute(stmt)
     db.commit()
     db.refresh(db_event)
     return db_event
 
 
+@router.post("/import")
+async def import_calendar_events(
+    request: Request,
+    calendar_id: int = Query(..., description="Calendar to import into"),
+    format: Optional[str] = Query(None, description="ndjson or ics (defaults from Content-Type)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk import events from an NDJSON or iCalendar body, streaming progress as NDJSON"""
+    calendar = await db.get(CalendarModel, calendar_id)
+    if not calendar:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendar not found"
+        )
+    if calendar.is_master:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The master calendar is a projection and cannot be imported into"
+        )
+    
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ics" if content_type.startswith("text/calendar") else "ndjson"
+    if format not in IMPORT_PARSERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported import format: {format}"
+        )
+    parse = IMPORT_PARSERS[format]
+    user_id = calendar.user_id
+    
+    async def progress():
+        # The request's session is closed before the body streams, so the import opens its own
+        async with AsyncSessionLocal() as import_db:
+            target = await import_db.get(CalendarModel, calendar_id)
+            async for report in import_events(import_db, target, parse(iter_lines(request.stream()))):
+                # The final report, even of a failed import, covers every chunk committed
+                if "done" in report:
+                    written_ids = report.pop("written_ids")
+                    report["projection_queued"] = False
+                    if report["written"]:
+                        # The events are stored either way; the next sync projects them if this fails
+                        try:
+                            await run_in_threadpool(enqueue_user_projection, user_id, written_ids)
+                            report["projection_queued"] = True
+                        except Exception:
+                            logger.exception("Could not queue the projection of user %s after an import", user_id)
+                yield json.dumps(report) + "\n"
+    
+    return _ImportProgressResponse(progress(), media_type="application/x-ndjson")
+
+
 @router.get("/", response_model=EventList)
-def get_events(
+async def get_events(
+    response: Response,
     calendar_id: Optional[int] = Query(None, description="Filter by calendar ID"),
     start_date: Optional[date] = Query(None, description="Filter events after this date"),
     end_date: Optional[date] = Query(None, description="Filter events before this date"),
     skip: int = Query(0, description="Number of events to skip"),
-    limit: int = Query(100, description="Maximum number of events to return"),
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, description="Maximum number of events to return"),
+    cursor: Optional[str] = Query(None, description="Resume after a previous page's next_cursor instead of skipping"),
+    include_total: Optional[bool] = Query(None, description="Count all matching events (defaults to off in cursor mode)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get events with optional filtering"""
-    query = db.query(EventModel)
+    """Get events with optional filtering, ordered by start time"""
+    query = select(EventModel)
     
     if calendar_id:
-        query = query.filter(EventModel.calendar_id == calendar_id)
+        query = query.where(EventModel.calendar_id == calendar_id)
     
     if start_date:
-        query = query.filter(EventModel.start_time >= start_date)
+        query = query.where(EventModel.start_time >= start_date)
     
     if end_date:
-        query = query.filter(EventModel.end_time <= end_date)
+        query = query.where(EventModel.end_time <= end_date)
     
-    total = query.count()
-    events = query.offset(skip).limit(limit).all()
+    if include_total is None:
+        include_total = cursor is None
+    # Only counted on request: a count walks every matching row, which keyset pages avoid
+    total = (await db.scalar(select(func.count()).select_from(query.subquery()))) if include_total else None
+    
+    query = query.order_by(EventModel.start_time, EventModel.id)
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        # Keyset pagination: seek past the last row instead of counting up to it
+        query = query.where(tuple_(EventModel.start_time, EventModel.id) > after)
+    else:
+        query = query.offset(skip)
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    events = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(events[-1].start_time, events[-1].id)
+    
+    # Every event write moves updated_at, so the page's rows, the total and the
+    # next cursor version the body without another pass over the listing
+    etag = make_etag(
+        "events", calendar_id, start_date, end_date, skip, limit, cursor, total, next_cursor,
+        [(event.id, event.updated_at) for event in events]
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     
     return EventList(
         events=events,
         total=total,
-        page=skip // limit + 1,
-        size=len(events)
+        page=None if cursor else skip // limit + 1,
+        size=len(events),
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{event_id}", response_model=Event)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+async def get_event(
+    event_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get a specific event by ID"""
-    db_event = db.query(EventModel).filter(EventModel.id == event_id).first()
+    db_event = await db.get(EventModel, event_id)
     if not db_event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
+    
+    etag = make_etag("event", db_event.id, db_event.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return db_event
 
 
@@ -73,11 +257,35 @@ def update_event(event_id: int, event_update: EventUpdate, db: Session = Depends
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
+    _check_not_master_copy(db_event)
     
     update_data = event_update.dict(exclude_unset=True)
+    # Days the event covered before the change must be freed as well
+    stale_days = changed_days([db_event])
     for field, value in update_data.items():
         setattr(db_event, field, value)
     
+    # The rule is expanded from the start time in the event's zone, so it is
+    # checked again when either of those changes too
+    if {"recurrence_rule", "start_time", "timezone", "is_all_day"} & update_data.keys():
+        _check_recurrence_rule(
+            db_event.recurrence_rule, db_event.start_time, db_event.timezone, db_event.is_all_day
+        )
+        db_event.is_recurring = db_event.recurrence_rule is not None
+    
+    if {"start_time", "end_time", "recurrence_rule"} & update_data.keys():
+        db.flush()
+        refresh_event_conflicts(db, db_event)
+    
+    if BUSY_FIELDS & update_data.keys():
+        days = changed_days([db_event])
+        if days is not None and stale_days is not None:
+            days |= stale_days
+        else:
+            days = None
+        for stmt in invalidate_busy_days(db_event.calendar_id, days):
+            db.execute(stmt)
+    
     db.commit()
     db.refresh(db_event)
     return db_event
@@ -92,39 +300,79 @@ def delete_event(event_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
+    _check_not_master_copy(db_event)
     
+    clear_event_conflicts(db, db_event.id)
+    record_event_deletion(db, db_event)
+    db.execute(adjust_event_count(db_event.calendar_id, -1))
+    for stmt in invalidate_busy_days(db_event.calendar_id, changed_days([db_event])):
+        db.execute(stmt)
+    for stmt in retire_master_copies([db_event.id]):
+        db.execute(stmt)
     db.delete(db_event)
     db.commit()
     return {"message": "Event deleted successfully"}
 
 
-@router.get("/conflicts/", response_model=List[Event])
+@router.get("/conflicts/", response_model=List[EventConflict])
 def get_conflicts(
+    user_id: int = Query(..., description="User whose calendars are checked"),
+    calendar_ids: Optional[List[int]] = Query(None, description="Restrict the check to these calendars"),
     start_date: Optional[date] = Query(None, description="Check conflicts after this date"),
     end_date: Optional[date] = Query(None, description="Check conflicts before this date"),
+    include_resolved: bool = Query(False, description="Also return resolved conflicts"),
     db: Session = Depends(get_db)
 ):
-    """Get events that have scheduling conflicts"""
-    query = db.query(EventModel)
+    """Get pairs of overlapping events with their overlap windows"""
+    scope = scoped_calendar_ids(db, user_id, calendar_ids)
+    if not scope:
+        return []
+
+    event = aliased(EventModel)
+    other = aliased(EventModel)
+    query = db.query(ConflictModel, event, other).join(
+        event, event.id == ConflictModel.event_id
+    ).join(
+        other, other.id == ConflictModel.conflicting_event_id
+    ).filter(
+        event.calendar_id.in_(scope),
+        other.calendar_id.in_(scope)
+    )
+    
+    if not include_resolved:
+        query = query.filter(ConflictModel.is_resolved == False)
     
     if start_date:
-        query = query.filter(EventModel.start_time >= start_date)
+        query = query.filter(ConflictModel.overlap_start >= start_date)
     
     if end_date:
-        query = query.filter(EventModel.end_time <= end_date)
-    
-    # This is a simplified conflict detection
-    # In a real implementation, you'd want more sophisticated logic
-    events = query.order_by(EventModel.start_time).all()
-    
-    conflicts = []
-    for i, event in enumerate(events):
-        for j, other_event in enumerate(events[i+1:], i+1):
-            if (event.start_time < other_event.end_time and 
-                event.end_time > other_event.start_time):
-                if event not in conflicts:
-                    conflicts.append(event)
-                if other_event not in conflicts:
-                    conflicts.append(other_event)
-    
-    return conflicts
\ No newline at end of file
+        query = query.filter(ConflictModel.overlap_end <= end_date)
+    
+    rows = query.order_by(ConflictModel.overlap_start, ConflictModel.id).all()
+    
+    return [
+        EventConflict(
+            id=conflict.id,
+            event=first,
+            conflicting_event=second,
+            severity=conflict.severity.value,
+            is_resolved=conflict.is_resolved,
+            overlap_start=conflict.overlap_start,
+            overlap_end=conflict.overlap_end,
+            overlap_duration_minutes=conflict.overlap_duration_minutes
+        )
+        for conflict, first, second in rows
+    ]
+
+
+@router.post("/conflicts/rebuild")
+def rebuild_conflicts(user_id: int, db: Session = Depends(get_db)):
+    """Recompute all stored conflicts for a user from scratch"""
+    counts = rebuild_user_conflicts(db, user_id)
+    db.commit()
+    
+    return {
+        "message": "Conflicts rebuilt",
+        "user_id": user_id,
+        **counts
+    }
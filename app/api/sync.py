@@ -1,14 +1,29 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.database import get_db
-from app.models.simple import Calendar as CalendarModel, Event as EventModel
+from app.database import AsyncSessionLocal, get_async_db, get_db
+from app.models.simple import Calendar as CalendarModel, Event as EventModel, EventOrigin
 from app.schemas.calendar import Calendar
+from app.services.event_count_service import recount_events
+from app.services.external_sync_service import ProviderSyncError, sync_external_calendar
+from app.services.feed_service import stream_ics_feed, stream_json_feed
+from app.services.providers.http import http_stats
+from app.services.sync_service import prune_tombstones, reconcile_busy_blocks, sync_master_projection
+from app.utils.http_cache import etag_matches, make_etag, not_modified
 
 router = APIRouter()
 
+# Feed renderers and media types by file extension
+FEEDS = {
+    "ics": (stream_ics_feed, "text/calendar; charset=utf-8"),
+    "json": (stream_json_feed, "application/json"),
+}
+
 
 @router.post("/master-calendar", response_model=Calendar)
 def create_master_calendar(user_id: int, db: Session = Depends(get_db)):
@@ -57,9 +72,61 @@ def get_master_calendar(user_id: int, db: Session = Depends(get_db)):
     return master_calendar
 
 
+@router.get("/master-calendar/{user_id}/feed.{extension}")
+async def get_master_calendar_feed(
+    user_id: int,
+    extension: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream the master calendar as an ICS or JSON feed for Cal.com to poll"""
+    if extension not in FEEDS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Feeds are available as .ics or .json"
+        )
+    
+    master_calendar = (await db.scalars(
+        select(CalendarModel).where(
+            CalendarModel.user_id == user_id,
+            CalendarModel.is_master == True
+        )
+    )).first()
+    if not master_calendar:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Master calendar not found. Create one first."
+        )
+    
+    # The projection and every deletion of a source with copies bump its version,
+    # so an unchanged feed is answered from this one row without rendering
+    etag = make_etag("master-feed", extension, master_calendar.id, master_calendar.projection_version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    render, media_type = FEEDS[extension]
+    
+    async def feed():
+        # The request's session is closed before the body streams, so the feed opens its own
+        async with AsyncSessionLocal() as feed_db:
+            async for chunk in render(feed_db, master_calendar):
+                yield chunk
+    
+    return StreamingResponse(
+        feed(),
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
 @router.post("/sync-to-master/{user_id}")
-def sync_to_master_calendar(user_id: int, create_busy_blocks: bool = True, db: Session = Depends(get_db)):
-    """Sync all events from source calendars to the master calendar"""
+def sync_to_master_calendar(
+    user_id: int,
+    create_busy_blocks: bool = True,
+    full: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Sync events changed since the last run from source calendars to the master calendar"""
     
     # Get master calendar
     master_calendar = db.query(CalendarModel).filter(
@@ -73,70 +140,34 @@ def sync_to_master_calendar(user_id: int, create_busy_blocks: bool = True, db: S
             detail="Master calendar not found. Create one first."
         )
     
-    # Get all source calendars (non-master calendars)
-    source_calendars = db.query(CalendarModel).filter(
-        CalendarModel.user_id == user_id,
-        CalendarModel.is_master == False,
-        CalendarModel.is_active == True
-    ).all()
-    
-    # Get all events from source calendars
-    source_calendar_ids = [cal.id for cal in source_calendars]
-    source_events = db.query(EventModel).filter(
-        EventModel.calendar_id.in_(source_calendar_ids)
-    ).all()
-    
-    # Track what we sync
-    synced_count = 0
-    
-    for source_event in source_events:
-        # Check if this event is already synced to master calendar
-        existing_sync = db.query(EventModel).filter(
-            EventModel.calendar_id == master_calendar.id,
-            EventModel.provider_event_id == f"sync_{source_event.id}"
-        ).first()
-        
-        if not existing_sync:
-            # Create a copy in the master calendar
-            master_event = EventModel(
-                calendar_id=master_calendar.id,
-                provider_event_id=f"sync_{source_event.id}",
-                title=f"[{source_event.title}]",  # Mark as synced
-                description=f"Synced from {source_event.calendar_id}: {source_event.description or ''}",
-                location=source_event.location,
-                start_time=source_event.start_time,
-                end_time=source_event.end_time,
-                timezone=source_event.timezone,
-                is_all_day=source_event.is_all_day,
-                status=source_event.status
-            )
-            
-            db.add(master_event)
-            synced_count += 1
-    
+    # Only sources written since the projection watermark are touched
+    projection = sync_master_projection(db, master_calendar, full=full)
+    db.commit()
+    prune_tombstones(db, master_calendar)
     db.commit()
     
-    # Optionally create busy blocks on source calendars
-    busy_blocks_created = 0
+    # Optionally reconcile busy blocks on source calendars
+    busy_blocks = {"inserted": 0, "updated": 0, "deleted": 0}
     if create_busy_blocks:
-        busy_blocks_created = create_cross_calendar_busy_blocks(user_id, db)
+        busy_blocks = reconcile_busy_blocks(db, user_id)
+        db.commit()
     
     return {
-        "message": f"Synced {synced_count} events to master calendar",
+        "message": f"Synced {projection['upserted']} events to master calendar",
         "master_calendar_id": master_calendar.id,
-        "source_calendars_count": len(source_calendars),
-        "total_events_in_master": db.query(EventModel).filter(
-            EventModel.calendar_id == master_calendar.id
-        ).count(),
-        "busy_blocks_created": busy_blocks_created
+        "incremental": projection["incremental"],
+        "removed_count": projection["removed"],
+        "total_events_in_master": master_calendar.event_count,
+        "busy_blocks_created": busy_blocks["inserted"],
+        "busy_blocks": busy_blocks
     }
 
 
 @router.post("/sync-from-external/{calendar_id}")
-def sync_from_external_calendar(calendar_id: int, db: Session = Depends(get_db)):
-    """Placeholder for syncing events FROM external calendars (Google, Outlook, etc.)"""
+async def sync_from_external_calendar(calendar_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Pull event changes FROM an external calendar (Google, Outlook, Cal.com) using its sync token"""
     
-    calendar = db.query(CalendarModel).filter(CalendarModel.id == calendar_id).first()
+    calendar = await db.get(CalendarModel, calendar_id)
     if not calendar:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -149,141 +180,100 @@ def sync_from_external_calendar(calendar_id: int, db: Session = Depends(get_db))
             detail="Cannot sync external events to master calendar directly"
         )
     
-    # TODO: Implement actual Google/Microsoft API calls here
-    # For now, return placeholder
+    provider = calendar.provider.value
+    try:
+        counts = await sync_external_calendar(db, calendar)
+    except ProviderSyncError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Sync with {provider} failed: {exc}"
+        )
     
     return {
-        "message": f"External sync not yet implemented for {calendar.provider}",
+        "message": f"Synced {counts['written']} changed events from {provider}",
         "calendar_id": calendar_id,
-        "provider": calendar.provider,
-        "next_steps": "Implement Google/Microsoft Calendar API integration"
+        "provider": provider,
+        **counts
     }
 
 
 @router.get("/sync-status/{user_id}")
-def get_sync_status(user_id: int, db: Session = Depends(get_db)):
+async def get_sync_status(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get overview of sync status for a user"""
     
-    # Get all calendars
-    all_calendars = db.query(CalendarModel).filter(
-        CalendarModel.user_id == user_id
-    ).all()
-    
-    master_calendar = next((cal for cal in all_calendars if cal.is_master), None)
-    source_calendars = [cal for cal in all_calendars if not cal.is_master]
-    
-    # Count events
-    master_events_count = 0
-    if master_calendar:
-        master_events_count = db.query(EventModel).filter(
-            EventModel.calendar_id == master_calendar.id
-        ).count()
-    
-    source_events_count = db.query(EventModel).filter(
-        EventModel.calendar_id.in_([cal.id for cal in source_calendars])
-    ).count()
+    # Counts and sync times are kept on the calendar rows, so one narrow
+    # query answers everything without touching events
+    rows = (await db.execute(
+        select(
+            CalendarModel.id,
+            CalendarModel.name,
+            CalendarModel.provider,
+            CalendarModel.is_master,
+            CalendarModel.event_count,
+            CalendarModel.last_sync_at
+        ).where(CalendarModel.user_id == user_id).order_by(CalendarModel.id)
+    )).all()
+    
+    master_calendar = next((row for row in rows if row.is_master), None)
+    source_calendars = [row for row in rows if not row.is_master]
+    source_syncs = [row.last_sync_at for row in source_calendars if row.last_sync_at]
     
     return {
         "user_id": user_id,
         "master_calendar": {
             "exists": master_calendar is not None,
             "id": master_calendar.id if master_calendar else None,
-            "events_count": master_events_count
+            "events_count": master_calendar.event_count if master_calendar else 0,
+            "last_sync_at": master_calendar.last_sync_at if master_calendar else None
         },
         "source_calendars": {
             "count": len(source_calendars),
-            "calendars": [{"id": cal.id, "name": cal.name, "provider": cal.provider} for cal in source_calendars],
-            "total_events": source_events_count
+            "calendars": [
+                {
+                    "id": cal.id,
+                    "name": cal.name,
+                    "provider": cal.provider,
+                    "events_count": cal.event_count,
+                    "last_sync_at": cal.last_sync_at
+                }
+                for cal in source_calendars
+            ],
+            "total_events": sum(cal.event_count for cal in source_calendars)
         },
-        "last_sync": "Not yet implemented"  # TODO: Add last sync tracking
+        "last_sync": max(source_syncs) if source_syncs else None
     }
 
 
-def create_cross_calendar_busy_blocks(user_id: int, db: Session) -> int:
-    """Create 'BUSY' blocks on each source calendar for events from OTHER calendars"""
-    
-    # Get all calendars for this user
-    all_calendars = db.query(CalendarModel).filter(
-        CalendarModel.user_id == user_id,
-        CalendarModel.is_active == True
-    ).all()
-    
-    source_calendars = [cal for cal in all_calendars if not cal.is_master]
-    
-    if len(source_calendars) <= 1:
-        return 0  # Need at least 2 source calendars for cross-sync
-    
-    busy_blocks_created = 0
-    
-    # For each source calendar
-    for target_calendar in source_calendars:
-        # Get events from ALL OTHER calendars (excluding this one and master)
-        other_calendar_ids = [cal.id for cal in source_calendars if cal.id != target_calendar.id]
-        
-        # Get events from other calendars
-        other_events = db.query(EventModel).filter(
-            EventModel.calendar_id.in_(other_calendar_ids)
-        ).all()
-        
-        # Create busy blocks on target calendar for each other event
-        for other_event in other_events:
-            # Check if busy block already exists
-            existing_busy = db.query(EventModel).filter(
-                EventModel.calendar_id == target_calendar.id,
-                EventModel.provider_event_id == f"busy_{other_event.id}"
-            ).first()
-            
-            if not existing_busy:
-                # Create busy block
-                busy_block = EventModel(
-                    calendar_id=target_calendar.id,
-                    provider_event_id=f"busy_{other_event.id}",
-                    title="BUSY",
-                    description=f"Busy due to event in another calendar: {other_event.title}",
-                    start_time=other_event.start_time,
-                    end_time=other_event.end_time,
-                    timezone=other_event.timezone,
-                    is_all_day=other_event.is_all_day,
-                    status="confirmed",
-                    visibility="private"  # Private so it doesn't show details
-                )
-                
-                db.add(busy_block)
-                busy_blocks_created += 1
-    
-    db.commit()
-    return busy_blocks_created
-
-
 @router.post("/create-busy-blocks/{user_id}")
 def create_busy_blocks_only(user_id: int, db: Session = Depends(get_db)):
-    """Create busy blocks on all source calendars without doing a full sync"""
+    """Reconcile busy blocks on all source calendars without doing a full sync"""
     
-    busy_blocks_created = create_cross_calendar_busy_blocks(user_id, db)
+    busy_blocks = reconcile_busy_blocks(db, user_id)
+    db.commit()
     
     return {
-        "message": f"Created {busy_blocks_created} busy blocks across calendars",
+        "message": (
+            f"Busy blocks reconciled: {busy_blocks['inserted']} created, "
+            f"{busy_blocks['updated']} updated, {busy_blocks['deleted']} deleted"
+        ),
         "user_id": user_id,
-        "busy_blocks_created": busy_blocks_created
+        "busy_blocks_created": busy_blocks["inserted"],
+        "busy_blocks": busy_blocks
     }
 
 
 @router.delete("/clear-busy-blocks/{user_id}")
 def clear_busy_blocks(user_id: int, db: Session = Depends(get_db)):
-    """Clear all busy blocks (events with title 'BUSY') for a user"""
-    
-    # Get all calendars for this user
-    user_calendars = db.query(CalendarModel).filter(
-        CalendarModel.user_id == user_id
-    ).all()
+    """Clear all generated busy blocks for a user"""
     
-    calendar_ids = [cal.id for cal in user_calendars]
+    user_calendar_ids = select(CalendarModel.id).where(CalendarModel.user_id == user_id)
     
     # Delete all busy block events
     deleted_count = db.query(EventModel).filter(
-        EventModel.calendar_id.in_(calendar_ids),
-        EventModel.title == "BUSY"
+        EventModel.calendar_id.in_(user_calendar_ids),
+        EventModel.origin == EventOrigin.BUSY_BLOCK
     ).delete(synchronize_session=False)
+    db.execute(recount_events([cal_id for (cal_id,) in db.execute(user_calendar_ids)]))
     
     db.commit()
     
@@ -291,4 +281,10 @@ def clear_busy_blocks(user_id: int, db: Session = Depends(get_db)):
         "message": f"Cleared {deleted_count} busy blocks",
         "user_id": user_id,
         "deleted_count": deleted_count
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/http-stats")
+def get_provider_http_stats():
+    """Request counts, retries and latency of the outbound provider clients in this process"""
+    return http_stats()
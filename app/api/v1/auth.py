@@ -1,22 +1,24 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from app.database import get_async_db
+from app.auth.hashing import password_hasher
 from app.auth.models import AuthUser
 from app.auth.schemas import UserRegister, UserLogin, Token, UserResponse
+from app.auth.cache import UserSnapshot, cache_stats
 from app.auth.jwt import create_access_token, get_current_active_user
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    existing_user = db.query(AuthUser).filter(
+    existing_user = (await db.scalars(select(AuthUser).where(
         or_(AuthUser.email == user_data.email, AuthUser.username == user_data.username)
-    ).first()
+    ))).first()
     
     if existing_user:
         raise HTTPException(
@@ -24,8 +26,8 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
             detail="User with this email or username already exists"
         )
     
-    # Create new user
-    hashed_password = AuthUser.hash_password(user_data.password)
+    # Create new user; bcrypt runs on the hasher pool, not the event loop
+    hashed_password = await password_hasher.hash(user_data.password)
     new_user = AuthUser(
         email=user_data.email,
         username=user_data.username,
@@ -33,25 +35,34 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     # Find user by username or email
-    user = db.query(AuthUser).filter(
+    user = (await db.scalars(select(AuthUser).where(
         or_(AuthUser.username == form_data.username, AuthUser.email == form_data.username)
-    ).first()
+    ))).first()
     
-    if not user or not user.verify_password(form_data.password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
@@ -62,11 +73,16 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: AuthUser = Depends(get_current_active_user)):
+def get_current_user_info(current_user: UserSnapshot = Depends(get_current_active_user)):
     return current_user
 
 @router.post("/logout")
-def logout(current_user: AuthUser = Depends(get_current_active_user)):
+def logout(current_user: UserSnapshot = Depends(get_current_active_user)):
     # In a stateless JWT system, logout is handled client-side
     # This endpoint can be used for audit logging
-    return {"message": "Successfully logged out"}
\ No newline at end of file
+    return {"message": "Successfully logged out"}
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Hit rates of the token and user caches used by authentication"""
+    return cache_stats()
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.api.v1 import auth
-from app.api import users, calendars, events, sync
+from app.api import users, calendars, events, sync, webhooks, availability
 
 api_router = APIRouter()
 
@@ -11,4 +11,6 @@ api_router.include_router(auth.router)
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(calendars.router, prefix="/calendars", tags=["calendars"])
 api_router.include_router(events.router, prefix="/events", tags=["events"])
-api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
\ No newline at end of file
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+api_router.include_router(availability.router, prefix="/availability", tags=["availability"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
\ No newline at end of file
@@ -0,0 +1,95 @@
+import hmac
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.database import get_async_db
+from app.models.simple import Calendar as CalendarModel, CalendarProvider
+from app.tasks.calendar_sync import enqueue_webhook_sync
+
+router = APIRouter()
+
+
+def _token_matches(expected: Optional[str], received: Optional[str]) -> bool:
+    return bool(expected) and received is not None and hmac.compare_digest(expected, received)
+
+
+async def _channel_calendars(db: AsyncSession, provider: CalendarProvider, channel_ids) -> Dict[str, CalendarModel]:
+    rows = (await db.scalars(
+        select(CalendarModel).where(
+            CalendarModel.provider == provider,
+            CalendarModel.webhook_channel_id.in_(channel_ids),
+            CalendarModel.is_active == True
+        )
+    )).all()
+    return {calendar.webhook_channel_id: calendar for calendar in rows}
+
+
+@router.post("/google")
+async def google_notification(
+    x_goog_channel_id: str = Header(...),
+    x_goog_resource_state: str = Header(...),
+    x_goog_channel_token: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Receive a Google Calendar push notification and schedule a coalesced sync"""
+
+    calendar = (await _channel_calendars(db, CalendarProvider.GOOGLE, [x_goog_channel_id])).get(x_goog_channel_id)
+    if not calendar or not _token_matches(calendar.webhook_token, x_goog_channel_token):
+        # Google stops retrying a channel that answers 404
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown notification channel"
+        )
+
+    # "sync" only confirms a new channel; there is nothing to fetch yet
+    queued = False
+    if x_goog_resource_state != "sync":
+        queued = await run_in_threadpool(enqueue_webhook_sync, calendar.user_id, calendar.id)
+
+    return {"message": "Notification received", "calendar_id": calendar.id, "sync_queued": queued}
+
+
+@router.post("/microsoft")
+async def microsoft_notification(
+    request: Request,
+    validation_token: Optional[str] = Query(None, alias="validationToken"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Receive Microsoft Graph change notifications and schedule coalesced syncs"""
+
+    # Graph validates a new subscription by expecting the token echoed back as text
+    if validation_token is not None:
+        return PlainTextResponse(validation_token)
+
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    # Valid JSON is not necessarily the object Graph sends
+    notifications = body.get("value", []) if isinstance(body, dict) else None
+    if not isinstance(notifications, list) or not all(isinstance(item, dict) for item in notifications):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid notification payload"
+        )
+
+    subscription_ids = {item.get("subscriptionId") for item in notifications} - {None}
+    calendars = await _channel_calendars(db, CalendarProvider.MICROSOFT, subscription_ids)
+
+    # A batch may hold many notifications for one calendar; each is queued once
+    to_sync = {}
+    for item in notifications:
+        calendar = calendars.get(item.get("subscriptionId"))
+        if calendar and _token_matches(calendar.webhook_token, item.get("clientState")):
+            to_sync[calendar.id] = calendar.user_id
+
+    for calendar_id, user_id in to_sync.items():
+        await run_in_threadpool(enqueue_webhook_sync, user_id, calendar_id)
+
+    # Graph retries anything but a quick 2xx, so unknown subscriptions are acknowledged too
+    return Response(status_code=status.HTTP_202_ACCEPTED)
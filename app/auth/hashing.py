@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.auth.models import pwd_context
+from app.config import settings
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a small dedicated thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without the fork cost of a process pool. At most ``max_pending`` calls may
+    be queued or running; beyond that, and for calls that exceed ``timeout``,
+    callers get a 503 instead of piling onto a saturated pool. A timed-out
+    hash keeps its thread until it finishes, since threads cannot be killed.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        # Released from the worker thread when a job ends, so guarded by a lock
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def _release(self, job: Optional[Future] = None) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def _run(self, fn: Callable, *args):
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent authentication requests",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        try:
+            job = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # A timed-out job still occupies its thread, so it counts until it ends;
+        # one still queued is cancelled by the timeout and ends right away
+        job.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing timed out",
+                headers={"Retry-After": "1"},
+            )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash if the stored one uses an outdated cost"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    timeout=settings.password_hash_timeout_seconds,
+)
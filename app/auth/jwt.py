@@ -5,6 +5,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.auth.cache import UserSnapshot, token_cache, token_cache_key, user_cache
 from app.auth.models import AuthUser
 from app.auth.schemas import TokenData
 from app.config import settings
@@ -28,7 +29,12 @@ def verify_token(token: str, credentials_exception):
         email: str = payload.get("email")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(user_id=user_id, email=email)
+        expires_at = payload.get("exp")
+        token_data = TokenData(
+            user_id=user_id,
+            email=email,
+            expires_at=datetime.utcfromtimestamp(expires_at) if expires_at is not None else None
+        )
         return token_data
     except JWTError:
         raise credentials_exception
@@ -39,13 +45,26 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token_data = verify_token(token, credentials_exception)
-    user = db.query(AuthUser).filter(AuthUser.id == token_data.user_id).first()
+    # Verified claims are cached until the token (or the cache TTL) expires
+    token_key = token_cache_key(token)
+    token_data = token_cache.get(token_key)
+    if token_data is None:
+        token_data = verify_token(token, credentials_exception)
+        ttl = None
+        if token_data.expires_at is not None:
+            ttl = (token_data.expires_at - datetime.utcnow()).total_seconds()
+        token_cache.set(token_key, token_data, ttl)
+    
+    user = user_cache.get(token_data.user_id)
     if user is None:
-        raise credentials_exception
+        db_user = db.query(AuthUser).filter(AuthUser.id == token_data.user_id).first()
+        if db_user is None:
+            raise credentials_exception
+        user = UserSnapshot.from_user(db_user)
+        user_cache.set(user.id, user)
     return user
 
-def get_current_active_user(current_user: AuthUser = Depends(get_current_user)):
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
@@ -18,6 +18,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     email: Optional[str] = None
+    expires_at: Optional[datetime] = None
     
 class UserResponse(BaseModel):
     id: int
@@ -22,13 +22,21 @@ app.add_middleware(
 )
 
 # Add rate limiting
-from app.middleware.rate_limit import AuthenticatedRateLimitMiddleware
+from app.middleware.rate_limit import AuthenticatedRateLimitMiddleware, create_rate_limit_backend
 from datetime import timedelta
 
 app.add_middleware(
     AuthenticatedRateLimitMiddleware,
     calls=100,  # 100 requests
-    period=timedelta(minutes=1)  # per minute
+    period=timedelta(minutes=1),  # per minute
+    backend=create_rate_limit_backend(settings.rate_limit_backend, settings.rate_limit_max_keys),
+    costs=[
+        # Sync and rebuild endpoints fan out into many queries
+        ("POST", "/api/v1/sync/", 10),
+        ("POST", "/api/v1/calendars/", 5),
+        ("POST", "/api/v1/events/conflicts/rebuild", 10),
+    ],
+    exempt_prefixes=["/api/v1/webhooks/"]
 )
 
 
@@ -46,6 +54,16 @@ async def health_check():
     return {"status": "healthy"}
 
 
+from app.auth.hashing import password_hasher
+from app.services.providers.http import close_http_clients
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    password_hasher.shutdown()
+    await close_http_clients()
+
+
 # Models will be imported through the API modules
 
 # Include API v1 router
@@ -1,10 +1,121 @@
-from typing import Dict, Optional, Callable
+from typing import NamedTuple, Optional, Callable, Sequence, Tuple
 from datetime import datetime, timedelta
+import logging
 import time
-from fastapi import Request, Response, HTTPException, status
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-import asyncio
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # Seconds until the request would be allowed
+    reset_after: float  # Seconds until the full limit is available again
+
+
+class MemoryRateLimitBackend:
+    """Process-local GCRA storage, suitable for development and single workers.
+
+    Each key costs one float (its theoretical arrival time), held in an LRU
+    table capped at ``max_keys``. Keys whose arrival time has passed carry no
+    state and are evicted as they reach the cold end. ``hit`` never awaits, so
+    updates are atomic on the event loop without a lock.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.storage: "OrderedDict[str, float]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        # Drop a couple of expired entries per call so idle keys age out
+        for _ in range(2):
+            if not self.storage:
+                return
+            key, tat = next(iter(self.storage.items()))
+            if tat > now:
+                break
+            del self.storage[key]
+
+        while len(self.storage) > self.max_keys:
+            self.storage.popitem(last=False)
+
+    async def hit(self, key: str, calls: int, period: float, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        emission = period / calls
+
+        tat = max(self.storage.get(key, now), now)
+        new_tat = tat + emission * cost
+        allow_at = new_tat - emission * calls
+        if allow_at > now:
+            return RateLimitResult(False, 0, allow_at - now, tat - now)
+
+        self.storage[key] = new_tat
+        self.storage.move_to_end(key)
+        self._evict(now)
+        return RateLimitResult(True, int((now - allow_at) / emission + 1e-9), 0, new_tat - now)
+
+
+# Generic cell rate algorithm: the key holds the theoretical arrival time (TAT)
+# of the next request in microseconds of the Redis server clock, so every
+# worker shares one clock and one atomic read-modify-write.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission * cost
+local allow_at = new_tat - emission * burst
+if allow_at > now then
+    return {0, 0, allow_at - now, tat - now}
+end
+
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((now - allow_at) / emission), 0, new_tat - now}
+"""
+
+
+class RedisRateLimitBackend:
+    """Redis storage shared by every worker, one round trip per request"""
+
+    def __init__(self, redis_url: Optional[str] = None, client=None, prefix: str = "kronos:ratelimit:"):
+        if client is None:
+            from redis import asyncio as redis_asyncio
+
+            from app.config import settings
+            client = redis_asyncio.from_url(redis_url or settings.redis_url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, calls: int, period: float, cost: int = 1) -> RateLimitResult:
+        emission = period * 1_000_000 / calls
+        allowed, remaining, retry_after, reset_after = await self._script(
+            keys=[self.prefix + key], args=[emission, calls, cost]
+        )
+        return RateLimitResult(
+            bool(allowed), int(remaining), int(retry_after) / 1_000_000, int(reset_after) / 1_000_000
+        )
+
+
+def create_rate_limit_backend(name: str, max_keys: int = 100_000):
+    """Build the storage backend named by the RATE_LIMIT_BACKEND setting"""
+    if name == "redis":
+        return RedisRateLimitBackend()
+    if name == "memory":
+        return MemoryRateLimitBackend(max_keys=max_keys)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(
@@ -12,66 +123,87 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         app,
         calls: int = 100,
         period: timedelta = timedelta(minutes=1),
-        identifier: Optional[Callable[[Request], str]] = None
+        identifier: Optional[Callable[[Request], str]] = None,
+        backend=None,
+        costs: Sequence[Tuple[str, str, int]] = (),
+        exempt_prefixes: Sequence[str] = ()
     ):
         super().__init__(app)
         self.calls = calls
         self.period = period.total_seconds()
         self.identifier = identifier or self._default_identifier
-        self.storage: Dict[str, list] = defaultdict(list)
-        self._lock = asyncio.Lock()
-    
+        self.backend = backend or MemoryRateLimitBackend()
+        # (method, path prefix, cost) rules; the first match wins, default is 1
+        self.costs = list(costs)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    def _cost(self, request: Request) -> int:
+        for method, prefix, cost in self.costs:
+            if request.method == method and request.url.path.startswith(prefix):
+                return min(cost, self.calls)
+        return 1
+
     def _default_identifier(self, request: Request) -> str:
         # Use IP address as default identifier
         forwarded = request.headers.get("X-Forwarded-For")
         if forwarded:
             return forwarded.split(",")[0]
         return request.client.host if request.client else "anonymous"
-    
+
     async def dispatch(self, request: Request, call_next) -> Response:
         # Skip rate limiting for health checks
         if request.url.path in ["/health", "/", "/docs", "/openapi.json"]:
             return await call_next(request)
-        
+
+        # Provider push notifications arrive in bursts from shared IPs
+        if self.exempt_prefixes and request.url.path.startswith(self.exempt_prefixes):
+            return await call_next(request)
+
         identifier = self.identifier(request)
         now = time.time()
-        
-        async with self._lock:
-            # Clean old entries
-            self.storage[identifier] = [
-                timestamp for timestamp in self.storage[identifier]
-                if timestamp > now - self.period
-            ]
-            
-            # Check rate limit
-            if len(self.storage[identifier]) >= self.calls:
-                retry_after = int(self.period - (now - self.storage[identifier][0]))
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Rate limit exceeded",
-                    headers={"Retry-After": str(retry_after)}
-                )
-            
-            # Add current request
-            self.storage[identifier].append(now)
-        
+
+        try:
+            result = await self.backend.hit(identifier, self.calls, self.period, self._cost(request))
+        except Exception:
+            # Fail open: an unreachable limiter store must not take the API down
+            logger.warning("Rate limit backend unavailable, allowing request", exc_info=True)
+            return await call_next(request)
+
+        if not result.allowed:
+            # Returned rather than raised: exceptions from middleware bypass
+            # FastAPI's handlers and would surface as a 500
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(max(1, int(result.retry_after + 0.999)))}
+            )
+
         response = await call_next(request)
-        
+
         # Add rate limit headers
         response.headers["X-RateLimit-Limit"] = str(self.calls)
-        response.headers["X-RateLimit-Remaining"] = str(
-            self.calls - len(self.storage[identifier])
-        )
-        response.headers["X-RateLimit-Reset"] = str(int(now + self.period))
-        
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(int(now + result.reset_after))
+
         return response
 
 class AuthenticatedRateLimitMiddleware(RateLimitMiddleware):
     """Rate limiter that uses authenticated user ID when available"""
-    
-    def __init__(self, app, calls: int = 100, period: timedelta = timedelta(minutes=1)):
-        super().__init__(app, calls, period, identifier=self._auth_identifier)
-    
+
+    def __init__(
+        self,
+        app,
+        calls: int = 100,
+        period: timedelta = timedelta(minutes=1),
+        backend=None,
+        costs: Sequence[Tuple[str, str, int]] = (),
+        exempt_prefixes: Sequence[str] = ()
+    ):
+        super().__init__(
+            app, calls, period, identifier=self._auth_identifier, backend=backend,
+            costs=costs, exempt_prefixes=exempt_prefixes
+        )
+
     def _auth_identifier(self, request: Request) -> str:
         # Try to get user ID from JWT token
         auth_header = request.headers.get("Authorization")
@@ -79,6 +211,6 @@ class AuthenticatedRateLimitMiddleware(RateLimitMiddleware):
             # In production, decode JWT to get user ID
             # For now, use the token itself as identifier
             return f"user:{auth_header[7:20]}"  # Use first part of token
-        
+
         # Fall back to IP address
-        return self._default_identifier(request)
\ No newline at end of file
+        return self._default_identifier(request)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, DDL, Integer, String, Date, DateTime, Boolean, ForeignKey, LargeBinary, Text, Enum as SQLEnum, Index, UniqueConstraint, event, false, text
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
@@ -15,6 +15,7 @@ class User(Base):
     name = Column(String, nullable=False)
     timezone = Column(String, default="UTC")
     is_active = Column(Boolean, default=True)
+    busy_generation = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped by every busy-day invalidation
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -27,6 +28,15 @@ class CalendarProvider(enum.Enum):
 
 class Calendar(Base):
     __tablename__ = "calendars"
+    __table_args__ = (
+        # Duplicate check on create; its user_id prefix serves per-user listings
+        Index("ix_calendars_user_provider_calendar", "user_id", "provider", "provider_calendar_id"),
+        Index(
+            "ix_calendars_master_user", "user_id",
+            postgresql_where=text("is_master"),
+            sqlite_where=text("is_master"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -47,13 +57,61 @@ class Calendar(Base):
     last_sync_at = Column(DateTime)
     last_sync_token = Column(String)
     sync_errors = Column(Text)
+    projection_watermark = Column(DateTime)  # Master only: source changes up to here are projected
+    projection_version = Column(Integer, nullable=False, default=0, server_default="0")  # Master only: bumped whenever its events change
+    event_count = Column(Integer, nullable=False, default=0, server_default="0")  # Kept current by every event write
+    settings_changed_at = Column(DateTime, default=datetime.utcnow)  # Activation changes; the master projection re-projects the calendar wholesale
+    
+    # Push notifications: Google channel id or Microsoft subscription id, and its shared secret
+    webhook_channel_id = Column(String, unique=True, index=True)
+    webhook_token = Column(String)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class EventOrigin(enum.Enum):
+    NATIVE = "native"  # Created by the user or synced from a provider
+    MASTER_COPY = "master_copy"  # Projection of a source event onto the master calendar
+    BUSY_BLOCK = "busy_block"  # Generated placeholder for time taken in another calendar
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        UniqueConstraint("calendar_id", "provider_event_id", name="uq_events_calendar_provider_event"),
+        # Keyset pagination seeks on (start_time, id), optionally within a calendar
+        Index("ix_events_start_time_id", "start_time", "id"),
+        Index("ix_events_calendar_start_time_id", "calendar_id", "start_time", "id"),
+        # Overlap filters bound end_time from below; the planner picks whichever
+        # side of the window is more selective
+        Index("ix_events_calendar_end_time", "calendar_id", "end_time"),
+        # Incremental master projection reads sources written since its watermark
+        Index("ix_events_calendar_updated_at", "calendar_id", "updated_at"),
+        # Generated rows are a small fraction of the table, so partial indexes
+        # keep clearing and rebuilding them cheap
+        Index(
+            "ix_events_busy_blocks", "calendar_id", "start_time",
+            postgresql_where=text("origin = 'BUSY_BLOCK'"),
+            sqlite_where=text("origin = 'BUSY_BLOCK'"),
+        ),
+        Index(
+            "ix_events_source_event_id", "source_event_id",
+            postgresql_where=text("source_event_id IS NOT NULL"),
+            sqlite_where=text("source_event_id IS NOT NULL"),
+        ),
+        # Series and overrides are the other two arms of recurrence window filters
+        Index(
+            "ix_events_series", "calendar_id", "start_time",
+            postgresql_where=text("recurrence_rule IS NOT NULL"),
+            sqlite_where=text("recurrence_rule IS NOT NULL"),
+        ),
+        Index(
+            "ix_events_overrides", "calendar_id", "original_start_time",
+            postgresql_where=text("original_start_time IS NOT NULL"),
+            sqlite_where=text("original_start_time IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     calendar_id = Column(Integer, ForeignKey("calendars.id"), nullable=False)
@@ -72,6 +130,14 @@ class Event(Base):
     status = Column(String, default="confirmed")  # confirmed, tentative, cancelled
     visibility = Column(String, default="default")  # default, public, private
     
+    # Recurrence: a series row holds RRULE/EXDATE lines and is expanded on read.
+    # An override row replaces (or, when cancelled, removes) the occurrence of
+    # series recurring_event_id that would have started at original_start_time.
+    is_recurring = Column(Boolean, default=False)
+    recurrence_rule = Column(Text)
+    recurring_event_id = Column(String)
+    original_start_time = Column(DateTime)
+    
     # Meeting info
     meeting_url = Column(String)
     meeting_id = Column(String)
@@ -79,6 +145,101 @@ class Event(Base):
     # Sync tracking
     last_modified = Column(DateTime)
     etag = Column(String)
+    from_provider = Column(Boolean, nullable=False, default=False, server_default=false())  # Created by a provider sync, so full listings may sweep it
+    
+    # Generated rows point back at the event they were derived from
+    origin = Column(SQLEnum(EventOrigin), nullable=False, default=EventOrigin.NATIVE, server_default=EventOrigin.NATIVE.name)
+    source_event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"))
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# PostgreSQL also keeps each event's time as a generated range with a GiST
+# index, so overlap filters are index range scans. It is left unmapped: the
+# ORM never reads or writes it and SQLite, which has no range types, uses
+# plain comparisons instead (see recurrence_service.event_overlap).
+# GREATEST guards against rows whose end precedes their start.
+event.listen(Event.__table__, "after_create", DDL(
+    "ALTER TABLE events ADD COLUMN time_range tsrange "
+    "GENERATED ALWAYS AS (tsrange(start_time, GREATEST(start_time, end_time), '[)')) STORED"
+).execute_if(dialect="postgresql"))
+event.listen(Event.__table__, "after_create", DDL(
+    "CREATE INDEX ix_events_time_range ON events USING gist (time_range)"
+).execute_if(dialect="postgresql"))
+
+
+class EventTombstone(Base):
+    """Record of a deleted event, so incremental projections can see deletions"""
+    __tablename__ = "event_tombstones"
+    __table_args__ = (
+        Index("ix_event_tombstones_calendar_deleted_at", "calendar_id", "deleted_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, nullable=False)
+    calendar_id = Column(Integer, ForeignKey("calendars.id"), nullable=False)
+    provider_event_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ConflictType(enum.Enum):
+    OVERLAP = "overlap"
+    BACK_TO_BACK = "back_to_back"
+    TRAVEL_TIME = "travel_time"
+    DOUBLE_BOOKING = "double_booking"
+
+
+class ConflictSeverity(enum.Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+
+class Conflict(Base):
+    __tablename__ = "conflicts"
+    __table_args__ = (
+        # Pairs are stored once, with event_id < conflicting_event_id
+        UniqueConstraint("event_id", "conflicting_event_id", name="uq_conflicts_event_pair"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
+    conflicting_event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
+    
+    conflict_type = Column(SQLEnum(ConflictType), nullable=False)
+    severity = Column(SQLEnum(ConflictSeverity), nullable=False)
+    
+    description = Column(Text)
+    suggested_resolution = Column(Text)
+    
+    # Resolution tracking
+    is_resolved = Column(Boolean, default=False)
+    resolved_at = Column(DateTime)
+    resolution_notes = Column(Text)
+    
+    # Time overlap details
+    overlap_start = Column(DateTime)
+    overlap_end = Column(DateTime)
+    overlap_duration_minutes = Column(Integer)
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class BusyDay(Base):
+    """Cached busy bitmap of one user's UTC day, one bit per 5 minutes.
+
+    Rows are derived from events and dropped whenever an event on that day
+    changes; a missing row just means the day is recomputed on next read.
+    Readers only store a bitmap while the owner's ``busy_generation`` is the
+    one they saw before reading events, so a concurrent change is never
+    overwritten with a stale bitmap.
+    """
+    __tablename__ = "busy_days"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    bitmap = Column(LargeBinary, nullable=False)  # 288 bits, earliest slot in the high bit of byte 0
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,18 @@
+from typing import List
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class Availability(BaseModel):
+    user_id: int
+    timezone: str
+    start: datetime
+    end: datetime
+    slot_minutes: int
+    busy_intervals: int  # Busy runs in the busy bitmaps of the days covering the range, already merged
+    free_slots: List[TimeSlot]
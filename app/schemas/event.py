@@ -11,6 +11,9 @@ class EventBase(BaseModel):
     end_time: datetime
     timezone: str = "UTC"
     is_all_day: bool = False
+    recurrence_rule: Optional[str] = None  # RFC 5545 RRULE/EXDATE/RDATE lines
+    recurring_event_id: Optional[str] = None  # Overrides: provider_event_id of the series
+    original_start_time: Optional[datetime] = None  # Overrides: the occurrence replaced
 
 
 class EventCreate(EventBase):
@@ -18,6 +21,15 @@ class EventCreate(EventBase):
     calendar_id: int
 
 
+class EventImport(EventBase):
+    """One event of a bulk import; importing a provider_event_id again updates it"""
+    provider_event_id: str
+    status: str = "confirmed"
+    visibility: str = "default"
+    meeting_url: Optional[str] = None
+    etag: Optional[str] = None  # Rows whose etag matches the stored one are skipped
+
+
 class EventUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -26,6 +38,7 @@ class EventUpdate(BaseModel):
     end_time: Optional[datetime] = None
     timezone: Optional[str] = None
     is_all_day: Optional[bool] = None
+    recurrence_rule: Optional[str] = None
 
 
 class Event(EventBase):
@@ -35,7 +48,7 @@ class Event(EventBase):
     status: str
     visibility: str
     attendees: Optional[Dict[str, Any]] = None
-    is_recurring: bool
+    is_recurring: bool = False
     meeting_url: Optional[str] = None
     meeting_id: Optional[str] = None
     created_at: datetime
@@ -47,6 +60,18 @@ class Event(EventBase):
 
 class EventList(BaseModel):
     events: List[Event]
-    total: int
-    page: int
-    size: int
\ No newline at end of file
+    total: Optional[int] = None  # Omitted when not requested, e.g. in cursor mode
+    page: Optional[int] = None
+    size: int
+    next_cursor: Optional[str] = None
+
+
+class EventConflict(BaseModel):
+    id: Optional[int] = None
+    event: Event
+    conflicting_event: Event
+    overlap_start: datetime
+    overlap_end: datetime
+    overlap_duration_minutes: int
+    severity: Optional[str] = None
+    is_resolved: bool = False
@@ -0,0 +1,142 @@
+import re
+from datetime import datetime, time, timedelta, timezone
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from dateutil import tz
+
+from app.config import settings
+
+SLOT_PATTERN = re.compile(r"^(\d+)\s*(m|min|h)?$")
+
+
+def parse_slot(value: str) -> timedelta:
+    """Parse a slot length such as ``30m``, ``1h`` or ``45``; bare numbers are minutes"""
+    match = SLOT_PATTERN.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid slot length: {value}")
+    amount = int(match.group(1))
+    return timedelta(hours=amount) if match.group(2) == "h" else timedelta(minutes=amount)
+
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def to_epoch(values: Iterable[datetime]) -> np.ndarray:
+    """Naive UTC datetimes as int64 epoch seconds"""
+    # Far faster than np.array(..., dtype="datetime64[s]") on datetime objects
+    return np.fromiter(((value - EPOCH) // SECOND for value in values), dtype=np.int64)
+
+
+def from_epoch(seconds: np.ndarray) -> List[datetime]:
+    return seconds.astype("datetime64[s]").astype(datetime).tolist()
+
+
+def merge_busy(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Coalesce overlapping or touching intervals without a Python loop.
+
+    After sorting by start, a running maximum of the ends tells where every
+    group of overlapping intervals closes; a new group begins wherever a start
+    lies beyond the running end of everything before it.
+    """
+    if starts.size == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    running_end = np.maximum.accumulate(ends)
+    new_group = np.empty(starts.size, dtype=bool)
+    new_group[0] = True
+    new_group[1:] = starts[1:] > running_end[:-1]
+    group_starts = np.flatnonzero(new_group)
+    group_ends = np.append(group_starts[1:], starts.size) - 1
+    return starts[group_starts], running_end[group_ends]
+
+
+def subtract(
+    window_starts: np.ndarray, window_ends: np.ndarray, busy_starts: np.ndarray, busy_ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Remove merged busy intervals from sorted, disjoint windows.
+
+    The gaps between busy intervals are intersected with the windows: for each
+    window, binary search finds the run of gaps it touches, and the pairs are
+    expanded with ``np.repeat`` so the clipping is one vectorised step. Also
+    returns the index of the window each free interval came from.
+    """
+    gap_starts = np.concatenate(([np.iinfo(np.int64).min], busy_ends))
+    gap_ends = np.concatenate((busy_starts, [np.iinfo(np.int64).max]))
+
+    first = np.searchsorted(gap_ends, window_starts, side="right")
+    last = np.searchsorted(gap_starts, window_ends, side="left")
+    counts = np.maximum(last - first, 0)
+
+    window_index = np.repeat(np.arange(window_starts.size), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    gap_index = np.repeat(first, counts) + offsets
+
+    starts = np.maximum(window_starts[window_index], gap_starts[gap_index])
+    ends = np.minimum(window_ends[window_index], gap_ends[gap_index])
+    keep = ends > starts
+    return starts[keep], ends[keep], window_index[keep]
+
+
+def split_slots(
+    starts: np.ndarray, ends: np.ndarray, anchors: np.ndarray, slot_seconds: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cut free intervals into whole slots on a grid anchored at each interval's ``anchors`` entry"""
+    first = anchors + -(-(starts - anchors) // slot_seconds) * slot_seconds  # Round up to the grid
+    counts = np.maximum((ends - first) // slot_seconds, 0)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    slot_starts = np.repeat(first, counts) + offsets * slot_seconds
+    return slot_starts, slot_starts + slot_seconds
+
+
+def working_hours(start: datetime, end: datetime, tz_name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Working-hour windows in ``tz_name`` for the local days spanning two naive UTC instants.
+
+    Returned as epoch seconds and not clipped to the range. Each local day is
+    converted on its own, so windows follow DST changes.
+    """
+    zone = tz.gettz(tz_name) or tz.UTC
+    work_start = time.fromisoformat(settings.working_hours_start)
+    work_end = time.fromisoformat(settings.working_hours_end)
+
+    local_day = start.replace(tzinfo=timezone.utc).astimezone(zone).date()
+    last_day = end.replace(tzinfo=timezone.utc).astimezone(zone).date()
+    windows = []
+    while local_day <= last_day:
+        if local_day.weekday() in settings.working_days:
+            opens = datetime.combine(local_day, work_start, tzinfo=zone).astimezone(timezone.utc)
+            closes = datetime.combine(local_day, work_end, tzinfo=zone).astimezone(timezone.utc)
+            windows.append((opens.replace(tzinfo=None), closes.replace(tzinfo=None)))
+        local_day += timedelta(days=1)
+
+    if not windows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    opens, closes = (to_epoch(column) for column in zip(*windows))
+    return opens, closes
+
+
+def free_slots(
+    busy_starts: np.ndarray,
+    busy_ends: np.ndarray,
+    start: datetime,
+    end: datetime,
+    tz_name: str,
+    slot: timedelta,
+) -> List[Tuple[datetime, datetime]]:
+    """Free slots of length ``slot`` within working hours, given busy intervals as epoch seconds"""
+    busy_starts, busy_ends = merge_busy(busy_starts, busy_ends)
+
+    opens, closes = working_hours(start, end, tz_name)
+    # Clip the first and last day to the requested range; slots stay on the
+    # grid that starts when each working day opens
+    bounds = to_epoch([start, end])
+    window_starts, window_ends = np.maximum(opens, bounds[0]), np.minimum(closes, bounds[1])
+
+    free_starts, free_ends, window_index = subtract(window_starts, window_ends, busy_starts, busy_ends)
+    slot_starts, slot_ends = split_slots(
+        free_starts, free_ends, opens[window_index], int(slot.total_seconds())
+    )
+    return list(zip(from_epoch(slot_starts), from_epoch(slot_ends)))
@@ -0,0 +1,172 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Date, DateTime, LargeBinary, bindparam, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.simple import BusyDay, Calendar as CalendarModel, Event as EventModel, EventOrigin, User
+from app.services.availability_service import to_epoch
+from app.services.recurrence_service import EXPANSION_COLUMNS, expand_events, window_filter
+from app.utils.db import upsert_insert
+
+SLOT_SECONDS = 300
+SLOTS_PER_DAY = 24 * 60 * 60 // SLOT_SECONDS
+DAY = timedelta(days=1)
+
+
+def days_spanned(start: datetime, end: datetime) -> List[date]:
+    """UTC days that the interval [start, end) touches"""
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    return [start.date() + timedelta(days=i) for i in range((last - start.date()).days + 1)]
+
+
+def changed_days(events: Iterable) -> Optional[Set[date]]:
+    """Days whose bitmaps the given event states feed, or None if any may touch every day.
+
+    Pass both the old and new state of an updated event. Series can occur on
+    any day, so they return None; an override also frees its original slot.
+    """
+    days: Set[date] = set()
+    for event in events:
+        if event.recurrence_rule:
+            return None
+        days.update(days_spanned(event.start_time, event.end_time))
+        if event.original_start_time:
+            days.update(days_spanned(event.original_start_time, event.original_start_time + DAY))
+    return days
+
+
+def invalidate_busy_days(calendar_id: int, days: Optional[Iterable[date]]):
+    """UPDATE bumping the calendar owner's busy generation, then DELETE of their
+    cached days; ``days`` None drops all of them.
+
+    Execute both, in order, in the caller's transaction with the event write,
+    for either session type. Bumping first takes the owner's row lock, which
+    readers storing bitmaps wait on, so none can store a day after the delete
+    with a bitmap computed before the write committed.
+    """
+    owner = select(CalendarModel.user_id).where(CalendarModel.id == calendar_id).scalar_subquery()
+    bump = update(User).where(User.id == owner).values(
+        busy_generation=User.busy_generation + 1,
+        updated_at=User.updated_at
+    )
+    drop = delete(BusyDay).where(BusyDay.user_id == owner)
+    if days is not None:
+        drop = drop.where(BusyDay.day.in_(sorted(set(days))))
+    return bump, drop
+
+
+def rasterize(starts: np.ndarray, ends: np.ndarray, first_day: date, day_count: int) -> np.ndarray:
+    """Busy flags per 5-minute slot for ``day_count`` days from ``first_day``.
+
+    Intervals are rounded outwards to whole slots, so a slot is busy if any
+    event touches it. Uses a difference array, so overlapping events cost
+    nothing extra.
+    """
+    size = day_count * SLOTS_PER_DAY
+    base = to_epoch([datetime.combine(first_day, time.min)])[0]
+    first = np.clip((starts - base) // SLOT_SECONDS, 0, size)
+    last = np.clip(-(-(ends - base) // SLOT_SECONDS), 0, size)
+    delta = np.zeros(size + 1, dtype=np.int32)
+    np.add.at(delta, first, 1)
+    np.add.at(delta, last, -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def busy_runs(bits: np.ndarray, first_day: date) -> Tuple[np.ndarray, np.ndarray]:
+    """Busy intervals, as epoch-second arrays, from consecutive days of slot flags"""
+    edges = np.diff(np.concatenate(([0], bits.astype(np.int8), [0])))
+    base = to_epoch([datetime.combine(first_day, time.min)])[0]
+    starts = base + np.flatnonzero(edges == 1) * SLOT_SECONDS
+    ends = base + np.flatnonzero(edges == -1) * SLOT_SECONDS
+    return starts, ends
+
+
+async def _compute_days(db: AsyncSession, user_id: int, first_day: date, day_count: int) -> np.ndarray:
+    """Rasterize a run of days from the events of the user's active source calendars"""
+    start = datetime.combine(first_day, time.min)
+    end = start + day_count * DAY
+    # The master calendar and busy blocks only repeat source events
+    calendar_ids = select(CalendarModel.id).where(
+        CalendarModel.user_id == user_id,
+        CalendarModel.is_active == True,
+        CalendarModel.is_master == False
+    )
+    rows = (await db.execute(
+        select(*EXPANSION_COLUMNS).where(
+            EventModel.calendar_id.in_(calendar_ids),
+            EventModel.origin == EventOrigin.NATIVE,
+            # All-day events default to free time on every provider
+            EventModel.is_all_day.isnot(True),
+            or_(
+                EventModel.status.is_(None),
+                EventModel.status != "cancelled",
+                EventModel.original_start_time.isnot(None)
+            ),
+            window_filter(db, start, end)
+        )
+    )).all()
+
+    occurrences = list(expand_events(rows, start, end))
+    starts = to_epoch(occurrence.start_time for occurrence in occurrences)
+    ends = to_epoch(occurrence.end_time for occurrence in occurrences)
+    return rasterize(starts, ends, first_day, day_count)
+
+
+async def load_busy_bits(db: AsyncSession, user_id: int, first_day: date, last_day: date) -> np.ndarray:
+    """Busy slot flags for every day in [first_day, last_day], read from the bitmap cache.
+
+    Days without a fresh cached bitmap are computed from events in one query
+    covering the span of missing days, then stored for later reads unless an
+    invalidation has bumped the user's busy generation in the meantime.
+    """
+    day_count = (last_day - first_day).days + 1
+    generation = await db.scalar(select(User.busy_generation).where(User.id == user_id))
+    fresh_after = datetime.utcnow() - timedelta(seconds=settings.busy_cache_ttl_seconds)
+    cached: Dict[date, bytes] = {
+        row.day: row.bitmap
+        for row in (await db.execute(
+            select(BusyDay.day, BusyDay.bitmap).where(
+                BusyDay.user_id == user_id,
+                BusyDay.day >= first_day,
+                BusyDay.day <= last_day,
+                BusyDay.computed_at >= fresh_after
+            )
+        )).all()
+    }
+
+    missing = [first_day + timedelta(days=i) for i in range(day_count)
+               if first_day + timedelta(days=i) not in cached]
+    if missing:
+        span_start = missing[0]
+        span_days = (missing[-1] - span_start).days + 1
+        bitmaps = np.packbits(await _compute_days(db, user_id, span_start, span_days)).reshape(span_days, -1)
+
+        now = datetime.utcnow()
+        rows = []
+        for day in missing:
+            bitmap = bitmaps[(day - span_start).days].tobytes()
+            cached[day] = bitmap
+            rows.append({"day": day, "bitmap": bitmap, "computed_at": now})
+
+        # Selects no row once the generation has moved on; FOR SHARE waits out an
+        # uncommitted invalidation and then sees the generation it bumped
+        unchanged = select(
+            User.id,
+            bindparam("day", type_=Date),
+            bindparam("bitmap", type_=LargeBinary),
+            bindparam("computed_at", type_=DateTime)
+        ).where(User.id == user_id, User.busy_generation == generation).with_for_update(read=True)
+        stmt = upsert_insert(db, BusyDay).from_select(["user_id", "day", "bitmap", "computed_at"], unchanged)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={"bitmap": stmt.excluded.bitmap, "computed_at": stmt.excluded.computed_at}
+        )
+        conn = await db.connection()
+        await conn.execute(stmt, rows)
+        await db.commit()
+
+    packed = np.frombuffer(b"".join(cached[first_day + timedelta(days=i)] for i in range(day_count)), dtype=np.uint8)
+    return np.unpackbits(packed).astype(bool)
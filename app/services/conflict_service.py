@@ -0,0 +1,230 @@
+import heapq
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.simple import (
+    Calendar as CalendarModel,
+    Conflict as ConflictModel,
+    ConflictSeverity,
+    ConflictType,
+    Event as EventModel,
+    EventOrigin,
+)
+from app.services.recurrence_service import expand_events, expansion_window, window_filter
+
+# Keeps IN (...) lists well under driver parameter limits
+CHUNK_SIZE = 1000
+
+
+class OverlapPair(NamedTuple):
+    event: EventModel
+    conflicting_event: EventModel
+    overlap_start: datetime
+    overlap_end: datetime
+
+    @property
+    def overlap_duration_minutes(self) -> int:
+        return int((self.overlap_end - self.overlap_start).total_seconds() // 60)
+
+
+def find_overlapping_pairs(events: Iterable[EventModel]) -> List[OverlapPair]:
+    """Sweep-line overlap detection in O(n log n + k).
+
+    Events are visited in start order while a min-heap keyed on end time holds
+    the events still "open" at the current start. Everything left in the heap
+    after evicting finished events overlaps the current one, so each heap entry
+    visited produces a pair.
+    """
+    ordered = sorted(events, key=lambda e: (e.start_time, e.end_time, e.id))
+
+    pairs: List[OverlapPair] = []
+    active: list = []  # (end_time, position, event); occurrences of one series share an id
+
+    for position, event in enumerate(ordered):
+        while active and active[0][0] <= event.start_time:
+            heapq.heappop(active)
+
+        for end_time, _, other in active:
+            # Zero-length events starting at the same instant do not overlap,
+            # and a series overlapping itself is not a conflict
+            if event.end_time > other.start_time and event.id != other.id:
+                overlap_end = min(end_time, event.end_time)
+                pairs.append(OverlapPair(other, event, event.start_time, overlap_end))
+
+        heapq.heappush(active, (event.end_time, position, event))
+
+    pairs.sort(key=lambda p: (p.overlap_start, p.event.id, p.conflicting_event.id))
+    return pairs
+
+
+def scoped_calendar_ids(
+    db: Session, user_id: int, calendar_ids: Optional[List[int]] = None
+) -> List[int]:
+    """Resolve the calendars a user's conflict check runs over.
+
+    The master calendar only holds copies of source events, so it is never part
+    of the scope. An explicit calendar set is intersected with the user's own
+    calendars.
+    """
+    query = db.query(CalendarModel.id).filter(
+        CalendarModel.user_id == user_id,
+        CalendarModel.is_master == False,
+        CalendarModel.is_active == True
+    )
+    if calendar_ids:
+        query = query.filter(CalendarModel.id.in_(calendar_ids))
+
+    return [calendar_id for (calendar_id,) in query.all()]
+
+
+def conflict_scope_query(db: Session, calendar_ids: List[int]):
+    """Events that take part in conflict detection for the given calendars"""
+    return db.query(EventModel).filter(
+        EventModel.calendar_id.in_(calendar_ids),
+        # Busy blocks mirror events from other calendars, so they always overlap
+        EventModel.origin == EventOrigin.NATIVE
+    )
+
+
+def _severity(pair: OverlapPair) -> ConflictSeverity:
+    # An event swallowed whole by another is a hard double booking
+    for event in (pair.event, pair.conflicting_event):
+        if pair.overlap_start <= event.start_time and pair.overlap_end >= event.end_time:
+            return ConflictSeverity.HIGH
+    return ConflictSeverity.MEDIUM
+
+
+def _pair_key(pair: OverlapPair) -> FrozenSet[int]:
+    return frozenset((pair.event.id, pair.conflicting_event.id))
+
+
+def _apply_pairs(
+    db: Session, existing: List[ConflictModel], pairs: List[OverlapPair]
+) -> Dict[str, int]:
+    """Diff computed overlaps against stored conflict rows.
+
+    Rows that still overlap keep their resolution state and only have their
+    overlap window refreshed. Recurring events can overlap many times; each
+    pair of events is stored once, with its earliest overlap.
+    """
+    wanted: Dict[FrozenSet[int], OverlapPair] = {}
+    for pair in pairs:
+        wanted.setdefault(_pair_key(pair), pair)
+    inserted = updated = deleted = 0
+
+    for conflict in existing:
+        pair = wanted.pop(frozenset((conflict.event_id, conflict.conflicting_event_id)), None)
+        if pair is None:
+            db.delete(conflict)
+            deleted += 1
+            continue
+
+        if (conflict.overlap_start, conflict.overlap_end) != (pair.overlap_start, pair.overlap_end):
+            conflict.overlap_start = pair.overlap_start
+            conflict.overlap_end = pair.overlap_end
+            conflict.overlap_duration_minutes = pair.overlap_duration_minutes
+            conflict.severity = _severity(pair)
+            updated += 1
+
+    for pair in wanted.values():
+        first, second = sorted((pair.event, pair.conflicting_event), key=lambda e: e.id)
+        db.add(ConflictModel(
+            event_id=first.id,
+            conflicting_event_id=second.id,
+            conflict_type=ConflictType.OVERLAP,
+            severity=_severity(pair),
+            description=f"'{first.title}' overlaps '{second.title}'",
+            overlap_start=pair.overlap_start,
+            overlap_end=pair.overlap_end,
+            overlap_duration_minutes=pair.overlap_duration_minutes
+        ))
+        inserted += 1
+
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def _conflicts_involving(db: Session, event_id: int):
+    return db.query(ConflictModel).filter(
+        or_(
+            ConflictModel.event_id == event_id,
+            ConflictModel.conflicting_event_id == event_id
+        )
+    )
+
+
+def refresh_event_conflicts(db: Session, event: EventModel) -> Dict[str, int]:
+    """Bring the conflict rows of a single written event up to date.
+
+    Only events whose time range overlaps the written event are loaded, so the
+    cost is bounded by the event's neighbourhood rather than the calendar size.
+    The caller owns the transaction; the event must already be flushed.
+    """
+    existing = _conflicts_involving(db, event.id).all()
+
+    calendar = db.query(CalendarModel).filter(CalendarModel.id == event.calendar_id).first()
+    scope = scoped_calendar_ids(db, calendar.user_id) if calendar else []
+    if event.calendar_id not in scope or event.origin != EventOrigin.NATIVE:
+        return _apply_pairs(db, existing, [])
+
+    # A series can collide with anything in the expansion window
+    window_start, window_end = expansion_window()
+    if not event.recurrence_rule:
+        window_start, window_end = event.start_time, event.end_time
+    neighbours = conflict_scope_query(db, scope).filter(
+        EventModel.id != event.id,
+        window_filter(db, window_start, window_end)
+    ).all()
+
+    occurrences = expand_events(neighbours + [event], window_start, window_end)
+    pairs = [pair for pair in find_overlapping_pairs(occurrences)
+             if event.id in (pair.event.id, pair.conflicting_event.id)]
+    return _apply_pairs(db, existing, pairs)
+
+
+def refresh_conflicts_of(db: Session, event_ids: List[int]) -> Dict[str, int]:
+    """Refresh the conflict rows of events a bulk write touched, one event at a time.
+
+    Costs each event's neighbourhood, like the single-event API paths, instead
+    of the user's whole calendar. Ids of events deleted since are skipped. The
+    caller owns the transaction.
+    """
+    totals = {"inserted": 0, "updated": 0, "deleted": 0}
+    for start in range(0, len(event_ids), CHUNK_SIZE):
+        chunk = event_ids[start:start + CHUNK_SIZE]
+        for event in db.query(EventModel).filter(EventModel.id.in_(chunk)).order_by(EventModel.id).all():
+            for key, value in refresh_event_conflicts(db, event).items():
+                totals[key] += value
+            # The next event must find the rows stored for a pair it shares with this one
+            db.flush()
+    return totals
+
+
+def clear_event_conflicts(db: Session, event_id: int) -> int:
+    """Remove every conflict row that references an event about to be deleted"""
+    return _conflicts_involving(db, event_id).delete(synchronize_session=False)
+
+
+def rebuild_user_conflicts(db: Session, user_id: int) -> Dict[str, int]:
+    """Recompute all of a user's conflicts with the sweep-line engine.
+
+    Used to backfill the conflicts table and after bulk writes that bypass the
+    per-event maintenance. Recurring series are expanded over the default
+    expansion window. The caller owns the transaction.
+    """
+    scope = scoped_calendar_ids(db, user_id)
+    events = conflict_scope_query(db, scope).all() if scope else []
+
+    all_calendar_ids = db.query(CalendarModel.id).filter(CalendarModel.user_id == user_id)
+    event_ids = db.query(EventModel.id).filter(EventModel.calendar_id.in_(all_calendar_ids))
+    existing = db.query(ConflictModel).filter(
+        or_(
+            ConflictModel.event_id.in_(event_ids),
+            ConflictModel.conflicting_event_id.in_(event_ids)
+        )
+    ).all()
+
+    occurrences = expand_events(events, *expansion_window())
+    return _apply_pairs(db, existing, find_overlapping_pairs(occurrences))
@@ -0,0 +1,30 @@
+from typing import Iterable
+
+from sqlalchemy import func, select, update
+
+from app.models.simple import Calendar as CalendarModel, Event as EventModel
+
+
+def adjust_event_count(calendar_id: int, delta: int):
+    """UPDATE moving a calendar's cached event count by ``delta``.
+
+    Runs in the caller's transaction with the write it accounts for, for
+    either session type. ``updated_at`` is kept as is: the counter is not an
+    edit of the calendar.
+    """
+    return update(CalendarModel).where(CalendarModel.id == calendar_id).values(
+        event_count=CalendarModel.event_count + delta,
+        updated_at=CalendarModel.updated_at
+    )
+
+
+def recount_events(calendar_ids: Iterable[int]):
+    """UPDATE resetting cached event counts from the events table, for writers
+    whose net change is not known up front"""
+    counted = select(func.count(EventModel.id)).where(
+        EventModel.calendar_id == CalendarModel.id
+    ).scalar_subquery()
+    return update(CalendarModel).where(CalendarModel.id.in_(list(calendar_ids))).values(
+        event_count=counted,
+        updated_at=CalendarModel.updated_at
+    )
@@ -0,0 +1,283 @@
+import hashlib
+import re
+from datetime import datetime, time, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from dateutil import tz
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.simple import Calendar as CalendarModel
+from app.schemas.event import EventImport
+from app.services.external_sync_service import collect_written_ids, upsert_events
+from app.services.providers import ProviderEvent
+from app.services.recurrence_service import validate_rule
+
+# A parsed record: the line it started on, and its event or why it was rejected
+Parsed = Tuple[int, Union[ProviderEvent, str]]
+
+DURATION_PATTERN = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+ESCAPED_TEXT = re.compile(r"\\([\\;,nN])")
+RECURRENCE_PROPERTIES = ("RRULE", "RDATE", "EXDATE")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Numbered text lines of a streamed body; only the unfinished last line is buffered"""
+    number = 0
+    pending = b""
+    async for chunk in chunks:
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line.decode("utf-8", errors="replace").rstrip("\r").lstrip("﻿")
+    if pending:
+        yield number + 1, pending.decode("utf-8", errors="replace").rstrip("\r").lstrip("﻿")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored times are naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _checked(event: ProviderEvent) -> ProviderEvent:
+    if event.end_time < event.start_time:
+        raise ValueError("end_time is before start_time")
+    if event.recurrence_rule:
+        validate_rule(event.recurrence_rule, event.start_time, None if event.is_all_day else event.timezone)
+    return event
+
+
+async def parse_ndjson(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Parsed]:
+    """Events from newline-delimited JSON, one EventImport object per line"""
+    async for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = EventImport.model_validate_json(line)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            yield number, f"{location}: {error['msg']}" if location else error["msg"]
+            continue
+
+        fields = item.model_dump()
+        for name in ("start_time", "end_time", "original_start_time"):
+            fields[name] = _as_utc(fields[name])
+        try:
+            yield number, _checked(ProviderEvent(**fields))
+        except ValueError as exc:
+            yield number, str(exc)
+
+
+async def _unfold(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Tuple[int, str]]:
+    """Join RFC 5545 folded lines; continuations start with a space or tab"""
+    current = None
+    async for number, line in lines:
+        if line[:1] in (" ", "\t") and current is not None:
+            current = (current[0], current[1] + line[1:])
+            continue
+        if current is not None:
+            yield current
+        current = (number, line)
+    if current is not None:
+        yield current
+
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    """NAME;PARAM=VALUE;...:value, with quoted parameter values allowed to hold ; and :"""
+    quoted = False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        head, value = line, ""
+
+    name, *raw_params = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', head)
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def _unescape(value: str) -> str:
+    return ESCAPED_TEXT.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def _ics_time(params: Dict[str, str], value: str) -> Tuple[datetime, bool]:
+    """Naive UTC instant of a DATE or DATE-TIME value, and whether it was a DATE"""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.min), True
+
+    moment = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return moment, False
+    if "TZID" in params:
+        zone = tz.gettz(params["TZID"])
+        if zone is None:
+            raise ValueError(f"Unknown TZID {params['TZID']}")
+        return _as_utc(moment.replace(tzinfo=zone)), False
+    # Floating times have no zone of their own; they are read as UTC
+    return moment, False
+
+
+def _duration(value: str) -> timedelta:
+    match = DURATION_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid DURATION {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    length = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0)
+    )
+    return -length if sign == "-" else length
+
+
+def _ics_event(properties: List[Tuple[str, Dict[str, str], str, str]]) -> ProviderEvent:
+    first = {}
+    for name, params, value, _ in properties:
+        first.setdefault(name, (params, value))
+    if "UID" not in first:
+        raise ValueError("VEVENT has no UID")
+    if "DTSTART" not in first:
+        raise ValueError("VEVENT has no DTSTART")
+
+    uid = first["UID"][1]
+    start_params, start_value = first["DTSTART"]
+    start, is_all_day = _ics_time(start_params, start_value)
+    if "DTEND" in first:
+        end = _ics_time(*first["DTEND"])[0]
+    elif "DURATION" in first:
+        end = start + _duration(first["DURATION"][1])
+    else:
+        # RFC 5545: a date lasts one day, a date-time takes no time
+        end = start + timedelta(days=1) if is_all_day else start
+
+    recurrence = [line for name, _, _, line in properties if name in RECURRENCE_PROPERTIES]
+    provider_event_id, recurring_event_id, original_start_time = uid, None, None
+    if "RECURRENCE-ID" in first:
+        original_start_time = _ics_time(*first["RECURRENCE-ID"])[0]
+        recurring_event_id = uid
+        provider_event_id = f"{uid}_{original_start_time:%Y%m%dT%H%M%SZ}"
+
+    status = first.get("STATUS", ({}, "CONFIRMED"))[1].lower()
+    visibility = {"PUBLIC": "public", "PRIVATE": "private", "CONFIDENTIAL": "private"}.get(
+        first.get("CLASS", ({}, ""))[1].upper(), "default"
+    )
+    last_modified = _ics_time(*first["LAST-MODIFIED"])[0] if "LAST-MODIFIED" in first else None
+    meeting_url = first.get("X-GOOGLE-CONFERENCE", first.get("URL", ({}, None)))[1]
+
+    return _checked(ProviderEvent(
+        provider_event_id=provider_event_id,
+        title=_unescape(first.get("SUMMARY", ({}, "(No title)"))[1]),
+        start_time=start,
+        end_time=end,
+        # The raw lines identify a version exactly, so unchanged re-imports are skipped
+        etag=hashlib.sha1("\n".join(line for *_, line in properties).encode()).hexdigest(),
+        description=_unescape(first["DESCRIPTION"][1]) if "DESCRIPTION" in first else None,
+        location=_unescape(first["LOCATION"][1]) if "LOCATION" in first else None,
+        timezone=start_params.get("TZID", "UTC"),
+        is_all_day=is_all_day,
+        status=status,
+        visibility=visibility,
+        meeting_url=meeting_url,
+        last_modified=last_modified,
+        recurrence_rule="\n".join(recurrence) or None,
+        recurring_event_id=recurring_event_id,
+        original_start_time=original_start_time,
+    ))
+
+
+async def parse_ics(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Parsed]:
+    """Events of an iCalendar stream, parsed one VEVENT at a time.
+
+    Components nested in an event (alarms) are skipped, as are VTIMEZONE
+    blocks: TZID values are resolved as IANA zone names.
+    """
+    properties = None
+    start_number = 0
+    nested = 0
+    async for number, line in _unfold(lines):
+        if not line.strip():
+            continue
+        name, params, value = _split_property(line)
+        if properties is None:
+            if name == "BEGIN" and value.upper() == "VEVENT":
+                properties, start_number, nested = [], number, 0
+            continue
+
+        if name == "BEGIN":
+            nested += 1
+        elif name == "END" and nested:
+            nested -= 1
+        elif name == "END":
+            try:
+                yield start_number, _ics_event(properties)
+            except ValueError as exc:
+                yield start_number, str(exc)
+            properties = None
+        elif not nested:
+            properties.append((name, params, value, line))
+
+    if properties is not None:
+        yield start_number, "VEVENT is not closed"
+
+
+async def import_events(
+    db: AsyncSession, calendar: CalendarModel, records: AsyncIterator[Parsed]
+) -> AsyncIterator[Dict]:
+    """Upsert parsed events in chunks, yielding running counts after each chunk.
+
+    Each chunk is committed on its own, so a long import never holds one huge
+    transaction and a failure keeps the chunks already written. The last
+    report has ``done`` set, lists the first rejected rows and carries the
+    ``written_ids`` whose conflicts the projection refreshes, for the caller
+    to take off before reporting.
+    """
+    counts = {"processed": 0, "written": 0, "unchanged": 0, "created": 0, "rejected": 0}
+    errors: List[Dict] = []
+    batch: List[ProviderEvent] = []
+    written_ids: Optional[List[int]] = []
+
+    async def flush() -> None:
+        nonlocal written_ids
+        written = await upsert_events(db, calendar, batch, bulk=True)
+        written_ids = collect_written_ids(written_ids, written.pop("written_ids"))
+        for key, value in written.items():
+            counts[key] += value
+        await db.commit()
+        batch.clear()
+
+    try:
+        async for number, record in records:
+            counts["processed"] += 1
+            if isinstance(record, str):
+                counts["rejected"] += 1
+                if len(errors) < settings.import_max_reported_errors:
+                    errors.append({"line": number, "error": record})
+                continue
+
+            batch.append(record)
+            if len(batch) >= settings.import_chunk_size:
+                await flush()
+                yield dict(counts)
+        if batch:
+            await flush()
+    except SQLAlchemyError as exc:
+        await db.rollback()
+        yield {
+            **counts, "done": False, "errors": errors, "error": f"{type(exc).__name__}: {exc}",
+            "written_ids": written_ids,
+        }
+        return
+
+    yield {**counts, "done": True, "errors": errors, "written_ids": written_ids}
@@ -0,0 +1,333 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+from sqlalchemy import column, delete, insert, or_, select, table, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.simple import (
+    Calendar as CalendarModel,
+    Conflict as ConflictModel,
+    Event as EventModel,
+    EventOrigin,
+    EventTombstone as EventTombstoneModel,
+)
+from app.services.busy_cache_service import changed_days, invalidate_busy_days
+from app.services.event_count_service import adjust_event_count
+from app.services.providers import ProviderAdapter, ProviderEvent, SyncPage, SyncTokenExpired, get_adapter
+from app.services.recurrence_service import event_overlap
+from app.services.sync_service import retire_master_copies
+from app.utils.db import dialect_name, upsert_insert
+
+# Columns overwritten when a provider reports a changed event
+SYNCED_COLUMNS = (
+    "title", "description", "location", "start_time", "end_time", "timezone",
+    "is_all_day", "status", "visibility", "meeting_url", "last_modified", "etag",
+    "is_recurring", "recurrence_rule", "recurring_event_id", "original_start_time",
+)
+
+# Columns that decide which cached busy days an event touches
+BUSY_COLUMNS = (EventModel.start_time, EventModel.end_time, EventModel.recurrence_rule, EventModel.original_start_time)
+
+# Keeps IN (...) lists well under driver parameter limits
+DELETE_CHUNK_SIZE = 1000
+
+# Per-connection staging table for COPY-based bulk upserts on PostgreSQL
+IMPORT_TABLE = "event_import"
+
+
+class ProviderSyncError(Exception):
+    """The provider could not be reached or rejected the request"""
+
+
+def collect_written_ids(collected: Optional[List[int]], written: List[int]) -> Optional[List[int]]:
+    """Add ``written`` to the event ids a projection refreshes conflicts of.
+
+    None stands for more ids than ``conflict_refresh_max_events``, which the
+    projection answers with a full rebuild; it stays None once reached.
+    """
+    if collected is None or len(collected) + len(written) > settings.conflict_refresh_max_events:
+        return None
+    return collected + list(written)
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def _invalidate_days(db: AsyncSession, calendar: CalendarModel, events: List) -> None:
+    """Drop the cached busy days that ``events`` (old or new states) cover"""
+    days = changed_days(events)
+    if days is None or days:
+        for stmt in invalidate_busy_days(calendar.id, days):
+            await db.execute(stmt)
+
+
+async def _delete_events(db: AsyncSession, calendar: CalendarModel, provider_event_ids: List[str]) -> int:
+    """Delete synced events and their master copies, leaving tombstones for the projection"""
+    deleted = 0
+    for chunk in _chunks(provider_event_ids, DELETE_CHUNK_SIZE):
+        rows = (await db.execute(
+            select(EventModel.id, EventModel.provider_event_id, *BUSY_COLUMNS).where(
+                EventModel.calendar_id == calendar.id,
+                EventModel.provider_event_id.in_(chunk)
+            )
+        )).all()
+        if not rows:
+            continue
+        await _invalidate_days(db, calendar, rows)
+
+        event_ids = [row.id for row in rows]
+        now = datetime.utcnow()
+        await db.execute(insert(EventTombstoneModel), [
+            {
+                "event_id": row.id,
+                "calendar_id": calendar.id,
+                "provider_event_id": row.provider_event_id,
+                "deleted_at": now,
+            }
+            for row in rows
+        ])
+        await db.execute(delete(ConflictModel).where(or_(
+            ConflictModel.event_id.in_(event_ids),
+            ConflictModel.conflicting_event_id.in_(event_ids)
+        )))
+        for stmt in retire_master_copies(event_ids):
+            await db.execute(stmt)
+        await db.execute(delete(EventModel).where(EventModel.id.in_(event_ids)))
+        await db.execute(adjust_event_count(calendar.id, -len(rows)))
+        deleted += len(rows)
+    return deleted
+
+
+async def _copy_upsert(db: AsyncSession, rows: List[Dict]) -> List[int]:
+    """PostgreSQL bulk path: COPY rows into a temporary table, then upsert from it.
+
+    COPY streams rows in the binary protocol, far cheaper than binding every
+    value of a large multi-row INSERT.
+    """
+    columns = [name for name in rows[0] if name != "origin"]  # Left to the column default
+    # Same column types as events, without its constraints or defaults
+    await db.execute(text(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {IMPORT_TABLE} ON COMMIT DELETE ROWS "
+        f"AS SELECT {', '.join(columns)} FROM events WITH NO DATA"
+    ))
+    await db.execute(text(f"TRUNCATE {IMPORT_TABLE}"))
+    raw = await (await db.connection()).get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        IMPORT_TABLE, columns=columns, records=[tuple(row[name] for name in columns) for row in rows]
+    )
+
+    staged = table(IMPORT_TABLE, *(column(name) for name in columns))
+    stmt = upsert_insert(db, EventModel).from_select(columns, select(*staged.c))
+    return (await db.scalars(_on_conflict_update(stmt))).all()
+
+
+def _on_conflict_update(stmt):
+    """ON CONFLICT clause of the event upserts, returning the ids of the rows written"""
+    return stmt.on_conflict_do_update(
+        index_elements=["calendar_id", "provider_event_id"],
+        set_={
+            **{name: stmt.excluded[name] for name in SYNCED_COLUMNS},
+            # A provider sync takes over events it reports, never the other way round
+            "from_provider": or_(EventModel.from_provider, stmt.excluded.from_provider),
+            "updated_at": stmt.excluded.updated_at,
+        },
+        # Events whose etag is unchanged are skipped without a write
+        where=or_(EventModel.etag.is_(None), EventModel.etag.is_distinct_from(stmt.excluded.etag))
+    ).returning(EventModel.id)
+
+
+async def upsert_events(
+    db: AsyncSession,
+    calendar: CalendarModel,
+    events: List[ProviderEvent],
+    bulk: bool = False,
+    from_provider: bool = False,
+) -> Dict[str, Any]:
+    """Upsert events into a calendar keyed on (calendar_id, provider_event_id).
+
+    Keeps the calendar's event counter and busy-day cache in step. ``bulk``
+    writes large batches with COPY on PostgreSQL and an executemany elsewhere,
+    instead of one multi-row INSERT. ``from_provider`` marks the events as
+    owned by the calendar's provider. Besides the counts, returns the ids of
+    the rows written as ``written_ids``, whose conflicts are refreshed once the
+    user's changes are projected. The caller commits.
+    """
+    now = datetime.utcnow()
+    # ON CONFLICT cannot touch the same row twice in one statement
+    latest = {event.provider_event_id: event for event in events}
+    rows = [
+        {
+            "calendar_id": calendar.id,
+            "provider_event_id": event.provider_event_id,
+            **{name: getattr(event, name) for name in SYNCED_COLUMNS},
+            "origin": EventOrigin.NATIVE,
+            "from_provider": from_provider,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for event in latest.values()
+    ]
+    if not rows:
+        return {"written": 0, "unchanged": 0, "created": 0, "written_ids": []}
+
+    # Both the stored and the incoming times of a changed event free or fill busy days
+    stored = {}
+    for chunk in _chunks(list(latest), DELETE_CHUNK_SIZE):
+        stored.update((row.provider_event_id, row) for row in (await db.execute(
+            select(EventModel.provider_event_id, EventModel.etag, *BUSY_COLUMNS).where(
+                EventModel.calendar_id == calendar.id,
+                EventModel.provider_event_id.in_(chunk)
+            )
+        )).all())
+    changed = []
+    for event_id, event in latest.items():
+        previous = stored.get(event_id)
+        if previous is None:
+            changed.append(event)
+        elif previous.etag is None or previous.etag != event.etag:
+            changed.extend((event, previous))
+    await _invalidate_days(db, calendar, changed)
+    # Every event not stored yet is inserted by the upsert below
+    created = len(latest) - len(stored)
+    if created:
+        await db.execute(adjust_event_count(calendar.id, created))
+
+    if bulk and dialect_name(db) == "postgresql":
+        written_ids = await _copy_upsert(db, rows)
+    elif bulk:
+        # A list of parameter sets, which SQLAlchemy batches so RETURNING still works
+        conn = await db.connection()
+        written_ids = (await conn.execute(_on_conflict_update(upsert_insert(db, EventModel)), rows)).scalars().all()
+    else:
+        written_ids = (await db.scalars(_on_conflict_update(upsert_insert(db, EventModel).values(rows)))).all()
+    return {
+        "written": len(written_ids),
+        "unchanged": len(rows) - len(written_ids),
+        "created": created,
+        "written_ids": written_ids,
+    }
+
+
+async def _apply_page(db: AsyncSession, calendar: CalendarModel, page: SyncPage) -> Dict[str, Any]:
+    """Write one page of provider changes with a single bulk upsert"""
+    counts = await upsert_events(db, calendar, page.events, from_provider=True)
+    deleted = await _delete_events(db, calendar, page.deleted_ids)
+    return {
+        "written": counts["written"],
+        "unchanged": counts["unchanged"],
+        "deleted": deleted,
+        "written_ids": counts["written_ids"],
+    }
+
+
+async def _sweep_missing(
+    db: AsyncSession,
+    calendar: CalendarModel,
+    seen: Set[str],
+    window: Optional[Tuple[datetime, datetime]],
+) -> int:
+    """After a full listing, delete synced events the provider no longer has.
+
+    Only events a provider sync created are candidates, since events created
+    through the API or imported were never in the listing. With a ``window``,
+    so are events outside it.
+    """
+    query = select(EventModel.provider_event_id).where(
+        EventModel.calendar_id == calendar.id,
+        EventModel.origin == EventOrigin.NATIVE,
+        EventModel.from_provider == True
+    )
+    if window is not None:
+        query = query.where(event_overlap(db, *window))
+    local_ids = (await db.scalars(query)).all()
+    return await _delete_events(db, calendar, [event_id for event_id in local_ids if event_id not in seen])
+
+
+async def _run_sync(
+    db: AsyncSession, adapter: ProviderAdapter, calendar: CalendarModel, sync_token: Optional[str]
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Apply every page of changes; returns the counts, with the ids written, and
+    the token to resume from"""
+    full = sync_token is None
+    seen: Set[str] = set()
+    window = None
+    counts = {"pages": 0, "written": 0, "unchanged": 0, "deleted": 0}
+    written_ids: Optional[List[int]] = []
+
+    page_token = None
+    while True:
+        page = await adapter.list_changes(calendar, sync_token, page_token)
+        applied = await _apply_page(db, calendar, page)
+        written_ids = collect_written_ids(written_ids, applied.pop("written_ids"))
+        for key, value in applied.items():
+            counts[key] += value
+        counts["pages"] += 1
+        # Commit per page so a long sync never holds one huge transaction
+        await db.commit()
+
+        if full:
+            seen.update(event.provider_event_id for event in page.events)
+            window = window or page.window
+        if not page.next_page_token:
+            break
+        page_token = page.next_page_token
+
+    if full:
+        counts["deleted"] += await _sweep_missing(db, calendar, seen, window)
+
+    return {**counts, "written_ids": written_ids}, page.next_sync_token
+
+
+async def _record_sync(db: AsyncSession, calendar_id: int, **values) -> None:
+    """Store sync state with a plain UPDATE and commit it"""
+    await db.execute(update(CalendarModel).where(CalendarModel.id == calendar_id).values(**values))
+    await db.commit()
+
+
+async def record_sync_error(db: AsyncSession, calendar_id: int, message: str) -> None:
+    """Roll back a failed sync and store its error on the calendar, if the database allows"""
+    await db.rollback()
+    try:
+        await _record_sync(db, calendar_id, sync_errors=message)
+    except SQLAlchemyError:
+        await db.rollback()
+
+
+async def sync_external_calendar(db: AsyncSession, calendar: CalendarModel) -> Dict[str, Any]:
+    """Pull changes for one calendar from its provider into the events table.
+
+    Uses the stored ``last_sync_token`` to fetch only deltas and falls back to
+    a full listing (plus a sweep of events that disappeared) only when there
+    is no token or the provider has invalidated it. Each page of changes is
+    applied with one bulk upsert keyed on (calendar_id, provider_event_id).
+    Any failure is recorded in the calendar's ``sync_errors``; HTTP errors
+    are raised as ProviderSyncError, anything else as is.
+    """
+    calendar_id = calendar.id
+    try:
+        adapter = get_adapter(calendar.provider)
+        sync_token = calendar.last_sync_token if adapter.supports_delta else None
+        try:
+            counts, next_sync_token = await _run_sync(db, adapter, calendar, sync_token)
+            counts["full_resync"] = sync_token is None
+        except SyncTokenExpired:
+            counts, next_sync_token = await _run_sync(db, adapter, calendar, None)
+            counts["full_resync"] = True
+        await _record_sync(
+            db, calendar_id,
+            last_sync_at=datetime.utcnow(), last_sync_token=next_sync_token, sync_errors=None
+        )
+    except Exception as exc:
+        # Whatever failed, the error is recorded on a clean transaction
+        message = f"{type(exc).__name__}: {exc}"
+        await record_sync_error(db, calendar_id, message)
+        if isinstance(exc, httpx.HTTPError):
+            raise ProviderSyncError(message) from exc
+        raise
+
+    return counts
@@ -0,0 +1,246 @@
+import json
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
+
+from dateutil import tz
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.simple import Calendar as CalendarModel, Event as EventModel
+
+# Columns a feed entry is rendered from; rows are never loaded as models
+FEED_COLUMNS = (
+    EventModel.provider_event_id, EventModel.title, EventModel.description, EventModel.location,
+    EventModel.start_time, EventModel.end_time, EventModel.timezone, EventModel.is_all_day,
+    EventModel.status, EventModel.recurrence_rule, EventModel.recurring_event_id,
+    EventModel.original_start_time, EventModel.updated_at,
+)
+
+# RFC 5545 caps content lines at 75 octets, excluding the CRLF
+LINE_OCTETS = 75
+
+# VTIMEZONEs list a zone's offset changes from its earliest series to this many
+# years ahead; consumers keep the last offset listed beyond that
+TIMEZONE_YEARS_AHEAD = 10
+PROBE_STEP = timedelta(weeks=1)
+
+
+def _fold(line: str) -> str:
+    """Fold a content line into CRLF-terminated lines of at most 75 octets"""
+    parts = []
+    current, size = "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > LINE_OCTETS:
+            parts.append(current)
+            # Continuations start with a space, which counts towards their length
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def _text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _utc(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _uid(provider_event_id: str) -> str:
+    return f"{provider_event_id}@kronos"
+
+
+def _series_zone(row) -> Optional[tzinfo]:
+    """The zone a series is written in with TZID, or None to write it in UTC"""
+    if row.is_all_day or not row.recurrence_rule or not row.timezone or row.timezone == "UTC":
+        return None
+    # None for an unknown name; an empty one would have meant the server's own zone
+    return tz.gettz(row.timezone)
+
+
+def _offset(value: timedelta) -> str:
+    sign = "-" if value < timedelta(0) else "+"
+    minutes, seconds = divmod(int(abs(value.total_seconds())), 60)
+    return f"{sign}{minutes // 60:02d}{minutes % 60:02d}" + (f"{seconds:02d}" if seconds else "")
+
+
+def _transitions(zone: tzinfo, start: datetime, end: datetime) -> List[Tuple[datetime, timedelta, timedelta]]:
+    """UTC instants in [start, end) where the zone's offset changes, with the offsets before and after.
+
+    Probed a week at a time, then narrowed to the minute, through the same
+    dateutil zone the recurrence expansion uses. No zone changes its offset
+    twice within a week.
+    """
+    def offset(at: datetime) -> timedelta:
+        return at.replace(tzinfo=tz.UTC).astimezone(zone).utcoffset()
+
+    found = []
+    at, current = start, offset(start)
+    while at < end:
+        following = offset(at + PROBE_STEP)
+        if following != current:
+            low, high = 0, int(PROBE_STEP.total_seconds()) // 60
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset(at + timedelta(minutes=middle)) == current:
+                    low = middle
+                else:
+                    high = middle
+            found.append((at + timedelta(minutes=high), current, following))
+            current = following
+        at += PROBE_STEP
+    return found
+
+
+def _observance(zone: tzinfo, onset: datetime, before: timedelta, after: timedelta) -> List[str]:
+    local = onset.replace(tzinfo=tz.UTC).astimezone(zone)
+    kind = "DAYLIGHT" if local.dst() else "STANDARD"
+    lines = [
+        f"BEGIN:{kind}",
+        # Onsets are written in the local time in force before them
+        f"DTSTART:{onset + before:%Y%m%dT%H%M%S}",
+        f"TZOFFSETFROM:{_offset(before)}",
+        f"TZOFFSETTO:{_offset(after)}",
+    ]
+    if local.tzname():
+        lines.append(f"TZNAME:{_text(local.tzname())}")
+    lines.append(f"END:{kind}")
+    return lines
+
+
+@lru_cache(maxsize=256)
+def _vtimezone(name: str, first_year: int, last_year: int) -> str:
+    """VTIMEZONE for the TZID ``name``, covering the years given"""
+    zone = tz.gettz(name)
+    start, end = datetime(first_year, 1, 1), datetime(last_year + 1, 1, 1)
+    initial = start.replace(tzinfo=tz.UTC).astimezone(zone).utcoffset()
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{name}"]
+    lines.extend(_observance(zone, start, initial, initial))
+    for onset, before, after in _transitions(zone, start, end):
+        lines.extend(_observance(zone, onset, before, after))
+    lines.append("END:VTIMEZONE")
+    return "".join(_fold(line) for line in lines)
+
+
+def _ics_event(row) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        # Overrides share their series' UID and name the occurrence they replace
+        f"UID:{_uid(row.recurring_event_id or row.provider_event_id)}",
+        # Stamped with the row's own time so an unchanged feed renders byte for byte the same
+        f"DTSTAMP:{_utc(row.updated_at)}",
+    ]
+    zone = _series_zone(row)
+    if row.is_all_day:
+        end = max(row.end_time, row.start_time + timedelta(days=1))
+        lines.append(f"DTSTART;VALUE=DATE:{row.start_time:%Y%m%d}")
+        lines.append(f"DTEND;VALUE=DATE:{end:%Y%m%d}")
+    elif zone is not None:
+        # Series repeat in wall-clock time of their zone, as in recurrence_service
+        local_start = row.start_time.replace(tzinfo=tz.UTC).astimezone(zone)
+        local_end = row.end_time.replace(tzinfo=tz.UTC).astimezone(zone)
+        lines.append(f"DTSTART;TZID={row.timezone}:{local_start:%Y%m%dT%H%M%S}")
+        lines.append(f"DTEND;TZID={row.timezone}:{local_end:%Y%m%dT%H%M%S}")
+    else:
+        lines.append(f"DTSTART:{_utc(row.start_time)}")
+        lines.append(f"DTEND:{_utc(row.end_time)}")
+
+    if row.recurring_event_id and row.original_start_time:
+        if row.is_all_day:
+            lines.append(f"RECURRENCE-ID;VALUE=DATE:{row.original_start_time:%Y%m%d}")
+        else:
+            lines.append(f"RECURRENCE-ID:{_utc(row.original_start_time)}")
+    if row.recurrence_rule:
+        lines.extend(line for line in row.recurrence_rule.splitlines() if line.strip())
+
+    lines.append(f"SUMMARY:{_text(row.title)}")
+    if row.description:
+        lines.append(f"DESCRIPTION:{_text(row.description)}")
+    if row.location:
+        lines.append(f"LOCATION:{_text(row.location)}")
+    lines.append(f"STATUS:{(row.status or 'confirmed').upper()}")
+    lines.append("TRANSP:OPAQUE")
+    lines.append(f"LAST-MODIFIED:{_utc(row.updated_at)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def _json_event(row) -> str:
+    return json.dumps({
+        "uid": _uid(row.provider_event_id),
+        "title": row.title,
+        "description": row.description,
+        "location": row.location,
+        "start_time": row.start_time.isoformat(),
+        "end_time": row.end_time.isoformat(),
+        "timezone": row.timezone,
+        "is_all_day": row.is_all_day,
+        "status": row.status,
+        "recurrence_rule": row.recurrence_rule,
+        "recurring_event_uid": _uid(row.recurring_event_id) if row.recurring_event_id else None,
+        "original_start_time": row.original_start_time.isoformat() if row.original_start_time else None,
+        "updated_at": row.updated_at.isoformat(),
+    })
+
+
+async def _partitions(db: AsyncSession, master_calendar: CalendarModel) -> AsyncIterator[List]:
+    """The master's events in start order, fetched through a server-side cursor"""
+    result = await db.stream(
+        select(*FEED_COLUMNS)
+        .where(EventModel.calendar_id == master_calendar.id)
+        .order_by(EventModel.start_time, EventModel.id)
+        .execution_options(yield_per=settings.feed_batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def stream_ics_feed(db: AsyncSession, master_calendar: CalendarModel) -> AsyncIterator[str]:
+    """Render the master calendar as iCalendar, one chunk per batch of events"""
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Kronos//Master Calendar//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_text(master_calendar.name)}",
+    ))
+    # Every TZID the events below use needs its VTIMEZONE; unknown zones are written in UTC
+    zones = await db.execute(
+        select(EventModel.timezone, func.min(EventModel.start_time))
+        .where(
+            EventModel.calendar_id == master_calendar.id,
+            EventModel.recurrence_rule.isnot(None),
+            EventModel.is_all_day.isnot(True),
+            EventModel.timezone != "UTC"
+        )
+        .group_by(EventModel.timezone)
+        .order_by(EventModel.timezone)
+    )
+    last_year = datetime.utcnow().year + TIMEZONE_YEARS_AHEAD
+    yield "".join(
+        _vtimezone(name, min(first_start.year, last_year), last_year)
+        for name, first_start in zones
+        if name and tz.gettz(name) is not None
+    )
+    async for partition in _partitions(db, master_calendar):
+        yield "".join(_ics_event(row) for row in partition)
+    yield _fold("END:VCALENDAR")
+
+
+async def stream_json_feed(db: AsyncSession, master_calendar: CalendarModel) -> AsyncIterator[str]:
+    """Render the master calendar as one JSON document, one chunk per batch of events"""
+    header = {"calendar_id": master_calendar.id, "name": master_calendar.name}
+    yield json.dumps(header)[:-1] + ', "events": ['
+    separator = ""
+    async for partition in _partitions(db, master_calendar):
+        yield separator + ",".join(_json_event(row) for row in partition)
+        separator = ","
+    yield "]}"
@@ -0,0 +1,41 @@
+import enum
+from typing import Union
+
+from app.config import settings
+from app.services.providers.base import (
+    ProviderAdapter,
+    ProviderEvent,
+    SyncPage,
+    SyncTokenExpired,
+)
+from app.services.providers.caldotcom import CalDotComAdapter
+from app.services.providers.fake import FakeCalendarAdapter
+from app.services.providers.google import GoogleCalendarAdapter
+from app.services.providers.microsoft import MicrosoftCalendarAdapter
+
+ADAPTERS = {
+    "google": GoogleCalendarAdapter,
+    "microsoft": MicrosoftCalendarAdapter,
+    "caldotcom": CalDotComAdapter,
+}
+
+
+def get_adapter(provider: Union[str, enum.Enum]) -> ProviderAdapter:
+    """Adapter for a calendar's provider; every provider is faked when CALENDAR_PROVIDERS=fake"""
+    if settings.calendar_providers == "fake":
+        return FakeCalendarAdapter()
+
+    name = provider.value if isinstance(provider, enum.Enum) else provider
+    try:
+        return ADAPTERS[name]()
+    except KeyError:
+        raise ValueError(f"Unsupported calendar provider: {name}")
+
+
+__all__ = [
+    "ProviderAdapter",
+    "ProviderEvent",
+    "SyncPage",
+    "SyncTokenExpired",
+    "get_adapter",
+]
@@ -0,0 +1,82 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from app.models.simple import Calendar as CalendarModel
+
+
+class SyncTokenExpired(Exception):
+    """The provider no longer accepts the stored sync token; a full resync is needed"""
+
+
+@dataclass
+class ProviderEvent:
+    """An event as reported by a provider, normalised to naive UTC times"""
+    provider_event_id: str
+    title: str
+    start_time: datetime
+    end_time: datetime
+    etag: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    timezone: str = "UTC"
+    is_all_day: bool = False
+    status: str = "confirmed"
+    visibility: str = "default"
+    meeting_url: Optional[str] = None
+    last_modified: Optional[datetime] = None
+    # Series carry their RFC 5545 lines; overrides name their series and slot
+    recurrence_rule: Optional[str] = None
+    recurring_event_id: Optional[str] = None
+    original_start_time: Optional[datetime] = None
+
+    @property
+    def is_recurring(self) -> bool:
+        return self.recurrence_rule is not None
+
+
+@dataclass
+class SyncPage:
+    events: List[ProviderEvent] = field(default_factory=list)
+    deleted_ids: List[str] = field(default_factory=list)
+    next_page_token: Optional[str] = None  # More pages follow in this sync
+    next_sync_token: Optional[str] = None  # Set on the last page; resume from here next time
+    # Set on the first page of a full listing that only covers events overlapping this range
+    window: Optional[Tuple[datetime, datetime]] = None
+
+
+class ProviderAdapter:
+    """Fetches event changes for one calendar from an external provider.
+
+    ``list_changes`` returns one page of changes since ``sync_token`` (or every
+    event when it is None), and raises SyncTokenExpired when the provider has
+    invalidated the token. Providers without delta support set
+    ``supports_delta`` to False and never return a sync token, so every run is
+    a full listing that the engine reconciles by sweeping missing events.
+    Adapters whose full listings are bounded in time report the bounds in
+    ``SyncPage.window`` so the sweep leaves events outside them alone.
+    """
+
+    supports_delta = True
+
+    async def list_changes(
+        self, calendar: CalendarModel, sync_token: Optional[str], page_token: Optional[str]
+    ) -> SyncPage:
+        raise NotImplementedError
+
+
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an RFC 3339 timestamp or date into a naive UTC datetime"""
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+    # fromisoformat() takes neither 'Z' nor the 7-digit fractions Graph returns
+    value = _FRACTION.sub(r"\1", value.replace("Z", "+00:00"))
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,63 @@
+import hashlib
+import json
+from typing import Optional
+
+from app.config import settings
+from app.models.simple import Calendar as CalendarModel
+from app.services.providers.base import ProviderAdapter, ProviderEvent, SyncPage, parse_datetime
+from app.services.providers.http import get_http_client
+
+# Bookings in these states no longer occupy time
+INACTIVE_STATUSES = {"CANCELLED", "REJECTED"}
+
+
+class CalDotComAdapter(ProviderAdapter):
+    """Cal.com bookings API.
+
+    Cal.com has no delta endpoint, so every sync pages through all bookings.
+    An etag is derived from each booking's content, which lets the engine
+    skip rewriting bookings that did not change.
+    """
+
+    supports_delta = False
+    page_size = 100
+
+    async def list_changes(
+        self, calendar: CalendarModel, sync_token: Optional[str], page_token: Optional[str]
+    ) -> SyncPage:
+        page_number = int(page_token or 1)
+
+        client = get_http_client("caldotcom", settings.caldotcom_base_url)
+        response = await client.get("/bookings", params={
+            "apiKey": calendar.access_token or settings.caldotcom_api_key,
+            "take": self.page_size,
+            "page": page_number,
+        })
+        response.raise_for_status()
+        bookings = response.json().get("bookings", [])
+
+        page = SyncPage()
+        if len(bookings) == self.page_size:
+            page.next_page_token = str(page_number + 1)
+        for booking in bookings:
+            if booking.get("status") in INACTIVE_STATUSES:
+                page.deleted_ids.append(str(booking["id"]))
+            else:
+                page.events.append(self._to_event(booking))
+        return page
+
+    @staticmethod
+    def _to_event(booking: dict) -> ProviderEvent:
+        fingerprint = json.dumps(booking, sort_keys=True, default=str).encode()
+        return ProviderEvent(
+            provider_event_id=str(booking["id"]),
+            etag=hashlib.sha1(fingerprint).hexdigest(),
+            title=booking.get("title") or "(No title)",
+            description=booking.get("description"),
+            location=booking.get("location"),
+            start_time=parse_datetime(booking["startTime"]),
+            end_time=parse_datetime(booking["endTime"]),
+            status="tentative" if booking.get("status") == "PENDING" else "confirmed",
+            meeting_url=(booking.get("metadata") or {}).get("videoCallUrl"),
+            last_modified=parse_datetime(booking["updatedAt"]) if booking.get("updatedAt") else None,
+        )
@@ -0,0 +1,76 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.models.simple import Calendar as CalendarModel
+from app.services.providers.base import ProviderAdapter, ProviderEvent, SyncPage, SyncTokenExpired
+
+
+@dataclass
+class _FakeCalendar:
+    events: Dict[str, ProviderEvent] = field(default_factory=dict)
+    changes: List[tuple] = field(default_factory=list)  # (sequence, provider_event_id)
+    sequence: int = 0
+    oldest_valid_token: int = 0
+
+
+class FakeCalendarAdapter(ProviderAdapter):
+    """In-memory provider for local development and tests.
+
+    Calendars are keyed by ``provider_calendar_id``. Sync tokens are change
+    sequence numbers, so deltas, pagination and token expiry behave like a
+    real provider without any network access.
+    """
+
+    page_size = 100
+    calendars: Dict[str, _FakeCalendar] = {}
+
+    @classmethod
+    def _calendar(cls, provider_calendar_id: str) -> _FakeCalendar:
+        return cls.calendars.setdefault(provider_calendar_id, _FakeCalendar())
+
+    @classmethod
+    def put_event(cls, provider_calendar_id: str, event: ProviderEvent) -> None:
+        fake = cls._calendar(provider_calendar_id)
+        fake.sequence += 1
+        fake.events[event.provider_event_id] = event
+        fake.changes.append((fake.sequence, event.provider_event_id))
+
+    @classmethod
+    def delete_event(cls, provider_calendar_id: str, provider_event_id: str) -> None:
+        fake = cls._calendar(provider_calendar_id)
+        fake.sequence += 1
+        fake.events.pop(provider_event_id, None)
+        fake.changes.append((fake.sequence, provider_event_id))
+
+    @classmethod
+    def expire_sync_tokens(cls, provider_calendar_id: str) -> None:
+        fake = cls._calendar(provider_calendar_id)
+        fake.oldest_valid_token = fake.sequence
+
+    async def list_changes(
+        self, calendar: CalendarModel, sync_token: Optional[str], page_token: Optional[str]
+    ) -> SyncPage:
+        fake = self._calendar(calendar.provider_calendar_id)
+        since = int(sync_token) if sync_token else None
+        if since is not None and since < fake.oldest_valid_token:
+            raise SyncTokenExpired(calendar.id)
+
+        if since is None:
+            changed = sorted(fake.events)
+        else:
+            changed = sorted({event_id for sequence, event_id in fake.changes if sequence > since})
+
+        offset = int(page_token or 0)
+        batch = changed[offset:offset + self.page_size]
+        page = SyncPage()
+        if offset + self.page_size < len(changed):
+            page.next_page_token = str(offset + self.page_size)
+        else:
+            page.next_sync_token = str(fake.sequence)
+
+        for event_id in batch:
+            if event_id in fake.events:
+                page.events.append(fake.events[event_id])
+            else:
+                page.deleted_ids.append(event_id)
+        return page
@@ -0,0 +1,86 @@
+from typing import Optional
+from urllib.parse import quote
+
+from app.models.simple import Calendar as CalendarModel
+from app.services.providers.base import (
+    ProviderAdapter,
+    ProviderEvent,
+    SyncPage,
+    SyncTokenExpired,
+    parse_datetime,
+)
+from app.services.providers.http import get_http_client
+
+
+class GoogleCalendarAdapter(ProviderAdapter):
+    """Google Calendar events.list with incremental sync tokens"""
+
+    base_url = "https://www.googleapis.com/calendar/v3"
+    page_size = 250
+
+    async def list_changes(
+        self, calendar: CalendarModel, sync_token: Optional[str], page_token: Optional[str]
+    ) -> SyncPage:
+        # Deleted events only show up as status=cancelled when showDeleted is set
+        params = {"maxResults": self.page_size, "showDeleted": "true"}
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+
+        client = get_http_client("google", self.base_url)
+        response = await client.get(
+            f"/calendars/{quote(calendar.provider_calendar_id, safe='')}/events",
+            params=params,
+            headers={"Authorization": f"Bearer {calendar.access_token}"},
+        )
+        if response.status_code == 410:
+            raise SyncTokenExpired(calendar.id)
+        response.raise_for_status()
+        data = response.json()
+
+        page = SyncPage(
+            next_page_token=data.get("nextPageToken"),
+            next_sync_token=data.get("nextSyncToken"),
+        )
+        for item in data.get("items", []):
+            if item.get("status") == "cancelled" and "recurringEventId" not in item:
+                page.deleted_ids.append(item["id"])
+            else:
+                # Cancelled instances of a series are kept as overrides that remove their slot
+                page.events.append(self._to_event(item))
+        return page
+
+    @staticmethod
+    def _to_event(item: dict) -> ProviderEvent:
+        original = item.get("originalStartTime")
+        # Cancelled instances may carry nothing but their original start
+        start = item.get("start") or original
+        end = item.get("end") or original
+        meeting_url = item.get("hangoutLink")
+        for entry_point in item.get("conferenceData", {}).get("entryPoints", []):
+            if entry_point.get("entryPointType") == "video":
+                meeting_url = entry_point.get("uri")
+                break
+
+        return ProviderEvent(
+            provider_event_id=item["id"],
+            etag=item.get("etag"),
+            title=item.get("summary") or "(No title)",
+            description=item.get("description"),
+            location=item.get("location"),
+            start_time=parse_datetime(start.get("dateTime") or start["date"]),
+            end_time=parse_datetime(end.get("dateTime") or end["date"]),
+            timezone=start.get("timeZone") or "UTC",
+            is_all_day="date" in start,
+            status=item.get("status", "confirmed"),
+            visibility=item.get("visibility", "default"),
+            meeting_url=meeting_url,
+            last_modified=parse_datetime(item["updated"]) if item.get("updated") else None,
+            # Events are listed unexpanded: series with their rules, plus modified instances
+            recurrence_rule="\n".join(item["recurrence"]) if item.get("recurrence") else None,
+            recurring_event_id=item.get("recurringEventId"),
+            original_start_time=(
+                parse_datetime(original.get("dateTime") or original["date"]) if original else None
+            ),
+        )
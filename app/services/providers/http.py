@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import random
+import socket
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses a provider uses to ask us to slow down; both may carry Retry-After
+RETRY_STATUSES = {429, 503}
+
+
+class RequestStats:
+    """Per-provider request timings, reported by the HTTP stats endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.status_counts: Dict[int, int] = {}
+
+    def record(self, elapsed: float, status_code: Optional[int]) -> None:
+        self.requests += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        if status_code is None:
+            self.errors += 1
+        else:
+            self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 2) if self.requests else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "status_counts": dict(self.status_counts),
+        }
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class ProviderHTTPClient:
+    """One pooled ``httpx.AsyncClient`` shared by every sync against a provider.
+
+    Connections are kept alive between calls, so syncing many calendars reuses
+    a handful of TLS sessions instead of handshaking per request. Responses
+    with 429 or 503, and connection failures, are retried with exponential
+    backoff and full jitter; a Retry-After header overrides the computed delay.
+    """
+
+    def __init__(self, name: str, base_url: str = ""):
+        self.name = name
+        self.stats = RequestStats()
+        self.max_retries = settings.provider_http_max_retries
+
+        http2 = settings.provider_http2
+        if http2 and not _http2_available():
+            logger.warning("PROVIDER_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+
+        max_connections = settings.provider_http_max_connections.get(
+            name, settings.provider_http_default_max_connections
+        )
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=http2,
+            timeout=settings.provider_http_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings.provider_http_keepalive_seconds,
+            ),
+        )
+        # httpx pools are tied to the event loop that opened their connections
+        self.loop = asyncio.get_running_loop()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, settings.provider_http_backoff_max_seconds)
+        ceiling = settings.provider_http_backoff_base_seconds * (2 ** attempt)
+        return random.uniform(0, min(ceiling, settings.provider_http_backoff_max_seconds))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                # Nothing reached the provider, so any method is safe to resend
+                self.stats.record(time.perf_counter() - started, None)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, None)
+            else:
+                self.stats.record(time.perf_counter() - started, response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                await response.aclose()
+
+            attempt += 1
+            self.stats.retries += 1
+            logger.info("Retrying %s %s on %s in %.2fs (attempt %d)", method, url, self.name, delay, attempt)
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def drop_connections(self) -> None:
+        """Shut down the pooled sockets of a client whose event loop has closed.
+
+        ``aclose()`` needs the loop that opened the connections, so once it is
+        gone the sockets are shut down here and their transports are freed
+        along with the client.
+        """
+        for connection in self.client._transport._pool.connections:
+            stream = getattr(connection._connection, "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+_clients: Dict[str, ProviderHTTPClient] = {}
+
+
+def _discard(client: ProviderHTTPClient) -> None:
+    """Release a client that belongs to an event loop other than the running one"""
+    if client.loop.is_closed():
+        client.drop_connections()
+    else:
+        # Closes on that loop once it runs again
+        asyncio.run_coroutine_threadsafe(client.aclose(), client.loop)
+
+
+def get_http_client(provider: str, base_url: str = "") -> ProviderHTTPClient:
+    """Shared client for ``provider``, created on first use in the running event loop"""
+    client = _clients.get(provider)
+    # A client from an earlier loop (e.g. a finished asyncio.run) cannot be reused
+    if client is None or client.loop is not asyncio.get_running_loop():
+        if client is not None:
+            _discard(client)
+        client = _clients[provider] = ProviderHTTPClient(provider, base_url)
+    return client
+
+
+async def close_http_clients() -> None:
+    loop = asyncio.get_running_loop()
+    while _clients:
+        _, client = _clients.popitem()
+        if client.loop is loop:
+            await client.aclose()
+        else:
+            _discard(client)
+
+
+def http_stats() -> Dict[str, dict]:
+    return {name: client.stats.as_dict() for name, client in _clients.items()}
@@ -0,0 +1,193 @@
+import logging
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+from dateutil import rrule, tz
+from sqlalchemy import and_, func, literal_column, or_
+
+from app.config import settings
+from app.models.simple import Event as EventModel
+from app.utils.db import dialect_name
+
+logger = logging.getLogger(__name__)
+
+DAY = timedelta(days=1)
+
+# Columns expand_events reads, for callers that load rows rather than models
+EXPANSION_COLUMNS = (
+    EventModel.id, EventModel.calendar_id, EventModel.provider_event_id, EventModel.title,
+    EventModel.start_time, EventModel.end_time, EventModel.timezone, EventModel.is_all_day,
+    EventModel.status, EventModel.recurrence_rule, EventModel.recurring_event_id,
+    EventModel.original_start_time,
+)
+
+
+class Occurrence(NamedTuple):
+    """One instance of an event; a non-recurring event is its only occurrence"""
+    event: Any
+    start_time: datetime
+    end_time: datetime
+
+    @property
+    def id(self) -> int:
+        return self.event.id
+
+    @property
+    def calendar_id(self) -> int:
+        return self.event.calendar_id
+
+    @property
+    def title(self) -> str:
+        return self.event.title
+
+
+def _rule_set(rule: str, dtstart: datetime, zone) -> rrule.rruleset:
+    if zone is None:
+        return rrule.rrulestr(rule, dtstart=dtstart, forceset=True, unfold=True)
+    try:
+        local_start = dtstart.replace(tzinfo=timezone.utc).astimezone(zone)
+        return rrule.rrulestr(rule, dtstart=local_start, forceset=True, unfold=True)
+    except ValueError:
+        # Floating UNTIL/EXDATE values cannot mix with an aware DTSTART; read
+        # them all as wall-clock times in the event's zone instead
+        local_start = dtstart.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+        return rrule.rrulestr(rule, dtstart=local_start, forceset=True, unfold=True, ignoretz=True)
+
+
+class UnknownTimezoneError(ValueError):
+    """A series names a zone the tz database does not know, so it cannot be expanded"""
+
+
+def validate_rule(rule: str, dtstart: datetime, tz_name: Optional[str] = "UTC") -> None:
+    """Raise ValueError unless ``rule`` holds parseable RFC 5545 RRULE/EXDATE/RDATE lines"""
+    zone = tz.gettz(tz_name) if tz_name else None
+    if tz_name and zone is None:
+        raise UnknownTimezoneError(f"Unknown time zone {tz_name!r}")
+    try:
+        next(iter(_rule_set(rule, dtstart, zone)), None)
+    except TypeError as exc:
+        # Raised when aware and floating EXDATEs end up being compared
+        raise ValueError(str(exc))
+
+
+@lru_cache(maxsize=settings.recurrence_cache_size)
+def occurrence_starts(
+    rule: str, dtstart: datetime, tz_name: Optional[str], window_start: datetime, window_end: datetime
+) -> Tuple[datetime, ...]:
+    """Naive UTC start times of a series' occurrences in [window_start, window_end).
+
+    The rule is expanded in the event's own zone, so a 09:00 standup stays at
+    09:00 local time across DST changes, and is walked lazily: iteration stops
+    at the window end, so an unbounded series never yields more than the
+    occurrences inside the window. ``tz_name`` None means floating (all-day)
+    times. Results are cached per (rule, window), so callers should pass
+    windows aligned to whole days.
+    """
+    zone = tz.gettz(tz_name) if tz_name else None
+    if tz_name and zone is None:
+        # validate_rule keeps these out of the API and imports; rows synced
+        # from a provider may still carry one
+        logger.warning("Unknown time zone %r; expanding recurrence rule %r in UTC", tz_name, rule)
+        zone = tz.UTC
+    try:
+        rules = _rule_set(rule, dtstart, zone)
+        starts = []
+        for start in rules:
+            if start.tzinfo is None and zone is not None:
+                start = start.replace(tzinfo=zone)
+            if start.tzinfo is not None:
+                start = start.astimezone(timezone.utc).replace(tzinfo=None)
+            if start >= window_end:
+                break
+            if start >= window_start:
+                starts.append(start)
+        return tuple(starts)
+    except (ValueError, TypeError):
+        logger.warning("Cannot expand recurrence rule %r; using its first occurrence only", rule, exc_info=True)
+        return (dtstart,) if window_start <= dtstart < window_end else ()
+
+
+def _floor_day(value: datetime) -> datetime:
+    return datetime.combine(value.date(), time.min)
+
+
+def iter_occurrences(
+    event: Any, window_start: datetime, window_end: datetime, excluded: Iterable[datetime] = ()
+) -> Iterator[Occurrence]:
+    """Occurrences of a recurring event overlapping [window_start, window_end).
+
+    ``excluded`` holds original start times replaced by override rows.
+    """
+    duration = event.end_time - event.start_time
+    excluded = set(excluded)
+    tz_name = None if event.is_all_day else (event.timezone or "UTC")
+
+    # Widen to whole days so nearby windows share one cache entry
+    lo = _floor_day(window_start - duration)
+    hi = _floor_day(window_end) + DAY
+    for start in occurrence_starts(event.recurrence_rule, event.start_time, tz_name, lo, hi):
+        end = start + duration
+        if start < window_end and end > window_start and start not in excluded:
+            yield Occurrence(event, start, end)
+
+
+def expand_events(events: Iterable[Any], window_start: datetime, window_end: datetime) -> Iterator[Occurrence]:
+    """Turn event rows into occurrences, expanding series within the window.
+
+    Non-recurring rows pass through unchanged whatever their time, since callers
+    already bound them in SQL. Override rows knock their original slot out of
+    their series; cancelled overrides yield nothing themselves.
+    """
+    events = list(events)
+    overridden: Dict[Tuple[int, str], Set[datetime]] = {}
+    for event in events:
+        if event.recurring_event_id and event.original_start_time:
+            key = (event.calendar_id, event.recurring_event_id)
+            overridden.setdefault(key, set()).add(event.original_start_time)
+
+    for event in events:
+        if event.recurrence_rule:
+            excluded = overridden.get((event.calendar_id, event.provider_event_id), ())
+            yield from iter_occurrences(event, window_start, window_end, excluded)
+        elif event.original_start_time and event.status == "cancelled":
+            continue
+        else:
+            yield Occurrence(event, event.start_time, event.end_time)
+
+
+def expansion_window() -> Tuple[datetime, datetime]:
+    """Default window for background expansion (conflicts, busy blocks)"""
+    today = _floor_day(datetime.utcnow())
+    return (
+        today - timedelta(days=settings.recurrence_window_past_days),
+        today + timedelta(days=settings.recurrence_window_future_days),
+    )
+
+
+def event_overlap(db, window_start: datetime, window_end: datetime):
+    """SQL filter for events whose [start_time, end_time) overlaps the window.
+
+    On PostgreSQL this is ``&&`` against the GiST-indexed ``time_range``
+    column, an index range scan; elsewhere it is the equivalent comparisons.
+    """
+    if dialect_name(db) == "postgresql":
+        time_range = literal_column(f"{EventModel.__tablename__}.time_range")
+        return time_range.op("&&")(func.tsrange(window_start, window_end, "[)"))
+    return and_(EventModel.start_time < window_end, EventModel.end_time > window_start)
+
+
+def window_filter(db, window_start: datetime, window_end: datetime):
+    """SQL filter for rows that can contribute occurrences to a window.
+
+    Single events must overlap it; every series that starts before its end is
+    kept for expansion, as are overrides of slots near the window.
+    """
+    return or_(
+        event_overlap(db, window_start, window_end),
+        and_(EventModel.recurrence_rule.isnot(None), EventModel.start_time < window_end),
+        and_(
+            EventModel.original_start_time >= window_start - DAY,
+            EventModel.original_start_time < window_end
+        )
+    )
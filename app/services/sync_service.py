@@ -0,0 +1,368 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import String, cast, delete, func, literal, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models.simple import (
+    Calendar as CalendarModel,
+    Event as EventModel,
+    EventOrigin,
+    EventTombstone as EventTombstoneModel,
+)
+from app.services.event_count_service import adjust_event_count
+from app.services.recurrence_service import EXPANSION_COLUMNS, expand_events, expansion_window, window_filter
+from app.utils.db import upsert_insert
+from app.utils.intervals import merge_intervals
+
+# Columns copied verbatim from a source event onto its master copy
+MIRRORED_COLUMNS = (
+    "location", "start_time", "end_time", "timezone", "is_all_day", "status",
+    "is_recurring", "recurrence_rule", "original_start_time",
+)
+
+# Re-read a little before the watermark so writes committed late, or stamped by
+# a host with a slightly slow clock, are still picked up. Upserts are idempotent.
+WATERMARK_OVERLAP = timedelta(seconds=30)
+
+
+def _master_copy_id(source_id):
+    return literal("sync_") + cast(source_id, String)
+
+
+def project_to_master(
+    db: Session,
+    master_calendar: CalendarModel,
+    source_calendar_ids: List[int],
+    since: Optional[datetime] = None,
+) -> Tuple[int, int]:
+    """Upsert master-calendar copies of source events in one statement.
+
+    Copies are keyed on (calendar_id, provider_event_id) with provider ids of
+    the form ``sync_{source_id}``, so a single INSERT ... SELECT ... ON CONFLICT
+    both creates missing copies and refreshes copies whose source changed.
+    With ``since`` only sources written after that instant are considered.
+    Returns the number of rows written and how many of them were inserted;
+    the caller commits.
+    """
+    if not source_calendar_ids:
+        return 0, 0
+
+    now = datetime.utcnow()
+    # Overrides point at their series by provider id, which for master copies
+    # is the series copy's ``sync_{id}``
+    series = aliased(EventModel)
+    series_copy_id = select(_master_copy_id(series.id)).where(
+        series.calendar_id == EventModel.calendar_id,
+        series.provider_event_id == EventModel.recurring_event_id
+    ).scalar_subquery()
+
+    projected = {
+        "calendar_id": literal(master_calendar.id),
+        "provider_event_id": _master_copy_id(EventModel.id),
+        "title": literal("[") + EventModel.title + literal("]"),  # Mark as synced
+        "description": (
+            literal("Synced from ") + cast(EventModel.calendar_id, String)
+            + literal(": ") + func.coalesce(EventModel.description, "")
+        ),
+        **{name: getattr(EventModel, name) for name in MIRRORED_COLUMNS},
+        "recurring_event_id": series_copy_id,
+        "visibility": literal("default"),
+        "origin": literal(EventOrigin.MASTER_COPY, EventModel.origin.type),
+        "source_event_id": EventModel.id,
+        "created_at": literal(now),
+        "updated_at": literal(now),
+    }
+
+    source_rows = select(*projected.values()).where(
+        EventModel.calendar_id.in_(source_calendar_ids),
+        EventModel.origin == EventOrigin.NATIVE
+    )
+    if since is not None:
+        source_rows = source_rows.where(EventModel.updated_at > since)
+
+    stmt = upsert_insert(db, EventModel).from_select(list(projected), source_rows)
+    refreshed = ("title", "description", "recurring_event_id") + MIRRORED_COLUMNS
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["calendar_id", "provider_event_id"],
+        set_={
+            **{name: stmt.excluded[name] for name in refreshed},
+            "updated_at": stmt.excluded.updated_at,
+        },
+        # Leave untouched copies alone so unchanged rows cost no writes
+        where=or_(*(
+            getattr(EventModel, name).is_distinct_from(stmt.excluded[name])
+            for name in refreshed
+        ))
+    ).returning(EventModel.created_at)
+
+    # Refreshed copies keep their created_at, so only new ones carry this run's
+    created = db.execute(stmt).scalars().all()
+    return len(created), sum(1 for created_at in created if created_at == now)
+
+
+def _delete_master_copies(db: Session, master_calendar: CalendarModel, source_ids) -> int:
+    """Delete the master copies of a single-column select of source event ids"""
+    return db.query(EventModel).filter(
+        EventModel.calendar_id == master_calendar.id,
+        EventModel.source_event_id.in_(source_ids)
+    ).delete(synchronize_session=False)
+
+
+def retire_master_copies(source_event_ids):
+    """UPDATE of the master calendars holding copies of the given source
+    events, then DELETE of those copies.
+
+    For writers deleting source events outside a projection. The foreign key
+    would cascade to the copies anyway, but this keeps the master's counter
+    right and moves its projection version, so the feed's ETag changes.
+    ``source_event_ids`` is a list or a single-column select. Execute both, in
+    order, before deleting the sources, for either session type.
+    """
+    copies = select(func.count(EventModel.id)).where(
+        EventModel.calendar_id == CalendarModel.id,
+        EventModel.source_event_id.in_(source_event_ids)
+    ).scalar_subquery()
+    holders = select(EventModel.calendar_id).where(EventModel.source_event_id.in_(source_event_ids))
+    bump = update(CalendarModel).where(CalendarModel.id.in_(holders)).values(
+        event_count=CalendarModel.event_count - copies,
+        projection_version=CalendarModel.projection_version + 1,
+        updated_at=CalendarModel.updated_at
+    )
+    drop = delete(EventModel).where(EventModel.source_event_id.in_(source_event_ids))
+    return bump, drop
+
+
+def record_event_deletion(db: Session, event: EventModel) -> None:
+    """Leave a tombstone for an event that is being deleted"""
+    db.add(EventTombstoneModel(
+        event_id=event.id,
+        calendar_id=event.calendar_id,
+        provider_event_id=event.provider_event_id
+    ))
+
+
+def sync_master_projection(
+    db: Session, master_calendar: CalendarModel, full: bool = False
+) -> Dict[str, int]:
+    """Bring the master calendar up to date with its user's source calendars.
+
+    The master calendar's ``projection_watermark`` marks how far source changes
+    have been projected. An incremental run only touches sources written after
+    it, tombstones recorded after it, and calendars whose settings changed
+    after it (e.g. deactivated ones, whose copies are removed). Without a
+    watermark, or with ``full``, every copy is rebuilt and orphans are swept.
+    The caller commits.
+    """
+    started_at = datetime.utcnow()
+    watermark = None if full else master_calendar.projection_watermark
+
+    calendars = db.query(CalendarModel).filter(
+        CalendarModel.user_id == master_calendar.user_id,
+        CalendarModel.is_master == False
+    ).all()
+    active_ids = [cal.id for cal in calendars if cal.is_active]
+    inactive_ids = [cal.id for cal in calendars if not cal.is_active]
+
+    if watermark is None:
+        upserted, inserted = project_to_master(db, master_calendar, active_ids)
+        live_sources = select(EventModel.id).where(EventModel.calendar_id.in_(active_ids))
+        removed = db.query(EventModel).filter(
+            EventModel.calendar_id == master_calendar.id,
+            EventModel.origin == EventOrigin.MASTER_COPY,
+            or_(
+                EventModel.source_event_id.is_(None),
+                EventModel.source_event_id.not_in(live_sources)
+            )
+        ).delete(synchronize_session=False)
+    else:
+        since = watermark - WATERMARK_OVERLAP
+        changed_calendars = {
+            cal.id for cal in calendars if cal.settings_changed_at and cal.settings_changed_at > since
+        }
+
+        # Calendars whose settings changed are re-projected wholesale
+        reactivated = [cal_id for cal_id in active_ids if cal_id in changed_calendars]
+        steady = [cal_id for cal_id in active_ids if cal_id not in changed_calendars]
+        upserted, inserted = project_to_master(db, master_calendar, reactivated)
+        steady_upserted, steady_inserted = project_to_master(db, master_calendar, steady, since=since)
+        upserted += steady_upserted
+        inserted += steady_inserted
+
+        removed = 0
+        deactivated = [cal_id for cal_id in inactive_ids if cal_id in changed_calendars]
+        if deactivated:
+            removed += _delete_master_copies(
+                db, master_calendar,
+                select(EventModel.id).where(EventModel.calendar_id.in_(deactivated))
+            )
+
+        all_source_ids = active_ids + inactive_ids
+        if all_source_ids:
+            removed += _delete_master_copies(
+                db, master_calendar,
+                select(EventTombstoneModel.event_id).where(
+                    EventTombstoneModel.calendar_id.in_(all_source_ids),
+                    EventTombstoneModel.deleted_at > since
+                )
+            )
+
+    # Copies removed with their sources were already accounted for by retire_master_copies
+    if inserted or removed:
+        db.execute(adjust_event_count(master_calendar.id, inserted - removed))
+    if upserted or removed:
+        # Versions the master's feed, so pollers are told nothing changed otherwise
+        master_calendar.projection_version += 1
+    master_calendar.projection_watermark = started_at
+    master_calendar.last_sync_at = started_at
+    return {"upserted": upserted, "removed": removed, "incremental": watermark is not None}
+
+
+def prune_tombstones(db: Session, master_calendar: CalendarModel) -> int:
+    """Delete tombstones the master projection will never read again.
+
+    Incremental runs only look at tombstones recorded after the watermark less
+    WATERMARK_OVERLAP, so anything older in the user's source calendars is
+    spent once a projection has committed. The caller commits.
+    """
+    if master_calendar.projection_watermark is None:
+        return 0
+    source_ids = select(CalendarModel.id).where(
+        CalendarModel.user_id == master_calendar.user_id,
+        CalendarModel.is_master == False
+    )
+    return db.query(EventTombstoneModel).filter(
+        EventTombstoneModel.calendar_id.in_(source_ids),
+        EventTombstoneModel.deleted_at <= master_calendar.projection_watermark - WATERMARK_OVERLAP
+    ).delete(synchronize_session=False)
+
+
+def _diff_windows(existing: list, desired: list):
+    """Pair existing busy blocks with desired windows of one calendar.
+
+    Both inputs are sorted by start and ``desired`` is disjoint. Returns
+    (updates, inserts, deletes): blocks to move onto an overlapping window,
+    windows with no block to reuse, and blocks that cover nothing wanted.
+    Blocks already matching a window exactly are left out entirely.
+    """
+    by_window: Dict[tuple, list] = {}
+    for block in existing:
+        by_window.setdefault((block.start_time, block.end_time), []).append(block)
+
+    matched = set()
+    for window in desired:
+        if by_window.get(window):
+            by_window[window].pop()
+            matched.add(window)
+
+    spare = sorted(
+        (block for same in by_window.values() for block in same),
+        key=lambda block: (block.start_time, block.end_time)
+    )
+
+    updates, inserts, deletes = [], [], []
+    i = 0
+    for window in desired:
+        if window in matched:
+            continue
+        while i < len(spare) and spare[i].end_time <= window[0]:
+            deletes.append(spare[i])
+            i += 1
+        if i < len(spare) and spare[i].start_time < window[1]:
+            updates.append((spare[i], window))
+            i += 1
+        else:
+            inserts.append(window)
+    deletes.extend(spare[i:])
+    return updates, inserts, deletes
+
+
+def reconcile_busy_blocks(db: Session, user_id: int) -> Dict[str, int]:
+    """Make every source calendar's BUSY blocks mirror its siblings' events.
+
+    Each calendar gets one block per coalesced window of time taken up by
+    events in the user's other active source calendars. The wanted windows are
+    diffed against the blocks already stored, and only the difference is
+    written: unchanged blocks are kept, overlapping ones are resized, and the
+    rest are bulk inserted or deleted. Two queries load all state regardless
+    of the number of calendars. Only events and blocks overlapping the default
+    expansion window are considered, and recurring events block time for each
+    of their occurrences in it. The caller commits.
+    """
+    calendar_ids = [cal_id for (cal_id,) in db.query(CalendarModel.id).filter(
+        CalendarModel.user_id == user_id,
+        CalendarModel.is_master == False,
+        CalendarModel.is_active == True
+    ).all()]
+    if not calendar_ids:
+        return {"inserted": 0, "updated": 0, "deleted": 0}
+
+    window_start, window_end = expansion_window()
+    rows = db.query(*EXPANSION_COLUMNS, EventModel.origin).filter(
+        EventModel.calendar_id.in_(calendar_ids),
+        EventModel.origin.in_([EventOrigin.NATIVE, EventOrigin.BUSY_BLOCK]),
+        window_filter(db, window_start, window_end),
+        # Cancelled overrides are still needed to remove their slot from the series
+        or_(
+            EventModel.status.is_(None),
+            EventModel.status != "cancelled",
+            EventModel.original_start_time.isnot(None)
+        )
+    ).order_by(EventModel.start_time).all()
+
+    events = list(expand_events(
+        (row for row in rows if row.origin == EventOrigin.NATIVE), window_start, window_end
+    ))
+    blocks: Dict[int, list] = {cal_id: [] for cal_id in calendar_ids}
+    for row in rows:
+        if row.origin == EventOrigin.BUSY_BLOCK:
+            blocks[row.calendar_id].append(row)
+
+    now = datetime.utcnow()
+    inserts, updates, delete_ids = [], [], []
+    count_changes: Dict[int, int] = {}
+    for calendar_id in calendar_ids:
+        # With a single source calendar there is nothing to mirror
+        desired = merge_intervals(
+            (event.start_time, event.end_time)
+            for event in events if event.calendar_id != calendar_id
+        ) if len(calendar_ids) > 1 else []
+
+        moved, missing, stale = _diff_windows(blocks[calendar_id], desired)
+        updates.extend(
+            {"id": block.id, "start_time": start, "end_time": end, "updated_at": now}
+            for block, (start, end) in moved
+        )
+        inserts.extend(
+            {
+                "calendar_id": calendar_id,
+                "provider_event_id": f"busy_{uuid.uuid4().hex}",
+                "title": "BUSY",
+                "description": "Busy due to events in other calendars",
+                "start_time": start,
+                "end_time": end,
+                "timezone": "UTC",
+                "is_all_day": False,
+                "status": "confirmed",
+                "visibility": "private",  # Private so it doesn't show details
+                "origin": EventOrigin.BUSY_BLOCK,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for start, end in missing
+        )
+        delete_ids.extend(block.id for block in stale)
+        count_changes[calendar_id] = len(missing) - len(stale)
+
+    if delete_ids:
+        db.query(EventModel).filter(EventModel.id.in_(delete_ids)).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(EventModel, updates)
+    if inserts:
+        db.bulk_insert_mappings(EventModel, inserts)
+    for calendar_id, change in count_changes.items():
+        if change:
+            db.execute(adjust_event_count(calendar_id, change))
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
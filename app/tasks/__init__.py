@@ -1,2 +1,33 @@
-# Celery tasks will be added later when needed
-# For now, this is just a placeholder
\ No newline at end of file
+from celery import Celery
+
+from app.config import settings
+
+celery_app = Celery(
+    "kronos",
+    broker=settings.celery_broker_url or settings.redis_url,
+    backend=settings.celery_result_backend or settings.redis_url,
+    include=["app.tasks.calendar_sync"],
+)
+
+celery_app.conf.update(
+    timezone="UTC",
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # Syncs are idempotent, so redeliver tasks whose worker died mid-run
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Long provider calls should not strand prefetched tasks behind them
+    worker_prefetch_multiplier=1,
+    result_expires=3600,
+    task_routes={
+        "app.tasks.calendar_sync.sync_calendar": {"queue": "calendar_sync"},
+        "app.tasks.calendar_sync.finalize_user_sync": {"queue": "projection"},
+    },
+    beat_schedule={
+        "schedule-due-calendar-syncs": {
+            "task": "app.tasks.calendar_sync.schedule_due_syncs",
+            "schedule": settings.sync_schedule_interval_seconds,
+        },
+    },
+)
@@ -1,2 +1,247 @@
-# Calendar sync tasks will be implemented here
-# For now, this is just a placeholder
\ No newline at end of file
+import asyncio
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from celery import chord
+from celery.signals import worker_process_init, worker_process_shutdown
+from celery.utils.log import get_task_logger
+from sqlalchemy import and_, or_
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models.simple import Calendar as CalendarModel
+from app.services.conflict_service import rebuild_user_conflicts, refresh_conflicts_of
+from app.services.external_sync_service import (
+    ProviderSyncError,
+    collect_written_ids,
+    record_sync_error,
+    sync_external_calendar,
+)
+from app.services.providers.http import close_http_clients
+from app.services.sync_service import prune_tombstones, reconcile_busy_blocks, sync_master_projection
+from app.tasks import celery_app
+from app.tasks.locks import exclusive_lock, get_redis, semaphore
+
+logger = get_task_logger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+@worker_process_init.connect
+def _reset_pools_after_fork(**kwargs) -> None:
+    # Connections inherited from the parent process must not be shared across workers
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def run_async(coro):
+    """Run a coroutine on this worker process's long-lived event loop.
+
+    ``asyncio.run`` would close the loop after every task, stranding the async
+    engine's pooled connections, which are bound to the loop that opened them.
+    """
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def _close_http_clients(**kwargs) -> None:
+    if _loop is not None:
+        _loop.run_until_complete(close_http_clients())
+
+
+def _jitter(seconds: float) -> float:
+    return random.uniform(0, seconds)
+
+
+def _provider_limit(provider: str) -> int:
+    return settings.provider_sync_concurrency.get(provider, settings.provider_sync_default_concurrency)
+
+
+async def _sync_one(calendar_id: int) -> Optional[Dict]:
+    """Sync one calendar, or return None if its provider has no free slot"""
+    async with AsyncSessionLocal() as db:
+        calendar = await db.get(CalendarModel, calendar_id)
+        if calendar is None or calendar.is_master or not calendar.is_active:
+            return {"calendar_id": calendar_id, "status": "ignored", "changed": 0}
+
+        provider = calendar.provider.value
+        # Failures are reported rather than raised so the user's other calendars still get projected
+        try:
+            with semaphore(f"provider:{provider}", _provider_limit(provider), settings.sync_lock_ttl_seconds) as slot:
+                if not slot:
+                    return None
+                counts = await sync_external_calendar(db, calendar)
+        except ProviderSyncError as exc:
+            # Already recorded on the calendar by the sync
+            logger.warning("Sync of calendar %s with %s failed: %s", calendar_id, provider, exc)
+            return {"calendar_id": calendar_id, "status": "failed", "error": str(exc), "changed": False}
+        except Exception as exc:
+            logger.exception("Sync of calendar %s with %s failed", calendar_id, provider)
+            error = f"{type(exc).__name__}: {exc}"
+            await record_sync_error(db, calendar_id, error)
+            return {"calendar_id": calendar_id, "status": "failed", "error": error, "changed": False}
+
+    return {
+        "calendar_id": calendar_id,
+        "status": "synced",
+        "changed": counts["written"] + counts["deleted"],
+        **counts
+    }
+
+
+def _pending_key(calendar_id: int) -> str:
+    return f"kronos:sync:pending:{calendar_id}"
+
+
+@celery_app.task(bind=True, max_retries=None)
+def sync_calendar(self, calendar_id: int, retry_if_busy: bool = False) -> Dict:
+    """Pull one calendar's provider changes, at most once at a time per calendar"""
+    with exclusive_lock(f"calendar-sync:{calendar_id}", settings.sync_lock_ttl_seconds) as acquired:
+        if not acquired:
+            if retry_if_busy:
+                # A sync already in flight may have fetched before this change was notified
+                raise self.retry(countdown=settings.webhook_debounce_seconds)
+            return {"calendar_id": calendar_id, "status": "skipped", "changed": 0}
+        # Notifications arriving from here on may postdate our fetch, so let them schedule another sync
+        get_redis().delete(_pending_key(calendar_id))
+        result = run_async(_sync_one(calendar_id))
+
+    if result is None:
+        # Provider is at its concurrency cap; back off without holding a worker
+        backoff = settings.provider_busy_retry_seconds
+        raise self.retry(countdown=backoff + _jitter(backoff))
+    return result
+
+
+@celery_app.task(bind=True, max_retries=None)
+def finalize_user_sync(self, results: List[Dict], user_id: int) -> Dict:
+    """Project a user's synced calendars into the master calendar and refresh busy blocks and conflicts"""
+    changed = [result for result in results if result.get("changed")]
+    if not changed:
+        return {"user_id": user_id, "status": "unchanged"}
+
+    # Deleted events had their conflicts cleared by the sync; written ones get theirs
+    # refreshed here, unless no ids, or too many to go one by one, were passed on
+    written_ids: Optional[List[int]] = []
+    for result in changed:
+        written_ids = collect_written_ids(written_ids, result["written_ids"]) if "written_ids" in result else None
+
+    with exclusive_lock(f"user-projection:{user_id}", settings.sync_lock_ttl_seconds) as acquired:
+        if not acquired:
+            # Run again once the projection in flight is done, so these changes are not missed
+            raise self.retry(countdown=1 + _jitter(settings.provider_busy_retry_seconds))
+
+        db = SessionLocal()
+        try:
+            master_calendar = db.query(CalendarModel).filter(
+                CalendarModel.user_id == user_id,
+                CalendarModel.is_master == True
+            ).first()
+            projection = sync_master_projection(db, master_calendar) if master_calendar else None
+            db.commit()
+            if master_calendar:
+                # Only once the new watermark is committed are older tombstones spent
+                prune_tombstones(db, master_calendar)
+                db.commit()
+
+            busy_blocks = reconcile_busy_blocks(db, user_id)
+            db.commit()
+
+            # The bulk sync path skips per-event conflict maintenance
+            if written_ids is None:
+                conflicts = rebuild_user_conflicts(db, user_id)
+            else:
+                conflicts = refresh_conflicts_of(db, written_ids)
+            db.commit()
+        finally:
+            db.close()
+
+    return {
+        "user_id": user_id,
+        "status": "projected",
+        "projection": projection,
+        "busy_blocks": busy_blocks,
+        "conflicts": conflicts,
+    }
+
+
+def enqueue_user_sync(user_id: int, calendar_ids: List[int], countdown: float = 0):
+    """Fan out one sync task per calendar, then a single projection step for the user"""
+    header = [sync_calendar.s(calendar_id).set(countdown=countdown) for calendar_id in calendar_ids]
+    return chord(header)(finalize_user_sync.s(user_id))
+
+
+def enqueue_user_projection(user_id: int, written_ids: Optional[List[int]] = None):
+    """Project a user's calendars after their events changed outside a provider sync, e.g. an import.
+
+    ``written_ids`` are the events whose conflicts to refresh; None rebuilds all of the user's.
+    """
+    result = {"changed": True}
+    if written_ids is not None:
+        result["written_ids"] = written_ids
+    return finalize_user_sync.delay([result], user_id)
+
+
+def enqueue_webhook_sync(user_id: int, calendar_id: int) -> bool:
+    """Coalesce a burst of push notifications for a calendar into one delayed sync.
+
+    The first notification marks the calendar pending and schedules a sync one
+    debounce window later; later ones find the mark and are dropped. The sync
+    clears the mark just before fetching. Returns False for a dropped duplicate.
+    """
+    client = get_redis()
+    # The TTL only matters if the scheduled task is lost entirely
+    ttl = settings.webhook_debounce_seconds + settings.sync_lock_ttl_seconds
+    if not client.set(_pending_key(calendar_id), 1, nx=True, ex=ttl):
+        return False
+
+    try:
+        header = [sync_calendar.s(calendar_id, retry_if_busy=True).set(countdown=settings.webhook_debounce_seconds)]
+        chord(header)(finalize_user_sync.s(user_id))
+    except Exception:
+        client.delete(_pending_key(calendar_id))
+        raise
+    return True
+
+
+@celery_app.task
+def schedule_due_syncs() -> Dict[str, int]:
+    """Periodic entry point: enqueue every calendar not synced within the sync interval.
+
+    Calendars with a push channel are synced by their webhooks, so polling
+    them is only a slow safety net against missed notifications.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.sync_interval_seconds)
+    webhook_cutoff = now - timedelta(seconds=settings.webhook_fallback_sync_interval_seconds)
+    db = SessionLocal()
+    try:
+        due = db.query(CalendarModel.id, CalendarModel.user_id).filter(
+            CalendarModel.is_active == True,
+            CalendarModel.is_master == False,
+            or_(
+                CalendarModel.last_sync_at.is_(None),
+                and_(CalendarModel.webhook_channel_id.is_(None), CalendarModel.last_sync_at < cutoff),
+                CalendarModel.last_sync_at < webhook_cutoff
+            )
+        ).all()
+    finally:
+        db.close()
+
+    # A calendar stays due until its delayed task runs; mark it queued so later ticks skip it
+    client = get_redis()
+    by_user: Dict[int, List[int]] = defaultdict(list)
+    for calendar_id, user_id in due:
+        if client.set(f"kronos:sync:queued:{calendar_id}", 1, nx=True, ex=settings.sync_interval_seconds):
+            by_user[user_id].append(calendar_id)
+
+    # Spread each run over the jitter window instead of hitting providers in one burst
+    for user_id, calendar_ids in by_user.items():
+        enqueue_user_sync(user_id, calendar_ids, countdown=_jitter(settings.sync_jitter_seconds))
+
+    return {"users": len(by_user), "calendars": sum(len(ids) for ids in by_user.values())}
@@ -0,0 +1,69 @@
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import redis
+
+from app.config import settings
+
+_client: Optional[redis.Redis] = None
+
+# Compare-and-delete, so an expired lock re-acquired by another worker is never released by us
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Counting semaphore: holders are sorted-set members scored by acquire time,
+# and members older than the TTL are treated as crashed and reclaimed
+SEMAPHORE_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+return 1
+"""
+
+
+def get_redis() -> redis.Redis:
+    """Process-wide Redis client, created after the worker forks"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    return _client
+
+
+@contextmanager
+def exclusive_lock(name: str, ttl: int) -> Iterator[bool]:
+    """Yield True if this worker holds ``name``, False if someone else already does"""
+    client = get_redis()
+    key = f"kronos:lock:{name}"
+    token = uuid.uuid4().hex
+    acquired = bool(client.set(key, token, nx=True, ex=ttl))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            client.eval(RELEASE_SCRIPT, 1, key, token)
+
+
+@contextmanager
+def semaphore(name: str, limit: int, ttl: int) -> Iterator[bool]:
+    """Yield True if one of ``limit`` slots shared by all workers was taken"""
+    client = get_redis()
+    key = f"kronos:semaphore:{name}"
+    token = uuid.uuid4().hex
+    acquired = bool(client.eval(SEMAPHORE_ACQUIRE_SCRIPT, 1, key, time.time(), ttl, limit, token))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            client.zrem(key, token)
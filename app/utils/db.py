@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_name(db) -> str:
+    """Name of the database dialect behind a sync or async session, or a connection"""
+    if hasattr(db, "dialect"):
+        return db.dialect.name
+    return db.bind.dialect.name
+
+
+def upsert_insert(db, table):
+    """Dialect-specific INSERT that supports ON CONFLICT DO UPDATE.
+
+    PostgreSQL is the production database; SQLite is used for local runs and
+    shares the same on_conflict_do_update() API.
+    """
+    if dialect_name(db) == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare read throughput of the sync and async database paths.
+
+Two otherwise identical routes run the same event-list query, one as a sync
+``def`` on ``get_db`` (threadpool) and one as an ``async def`` on
+``get_async_db``. Requests are fired in-process through httpx's ASGI transport
+at a fixed concurrency against the database in DATABASE_URL.
+
+    uv run python -m benchmarks.async_vs_sync --requests 5000 --concurrency 500
+
+``--latency-ms`` adds a server-side ``pg_sleep`` to each query to model a
+remote database, which is where the threadpool cap shows most clearly.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import async_engine, engine, get_async_db, get_db
+from app.models.simple import Event as EventModel
+
+
+def build_app(latency_ms: int) -> FastAPI:
+    app = FastAPI()
+    query = select(EventModel).order_by(EventModel.start_time, EventModel.id).limit(50)
+    sleep = text("SELECT pg_sleep(:seconds)").bindparams(seconds=latency_ms / 1000)
+
+    @app.get("/sync")
+    def sync_events(db: Session = Depends(get_db)):
+        if latency_ms:
+            db.execute(sleep)
+        return {"size": len(db.scalars(query).all())}
+
+    @app.get("/async")
+    async def async_events(db: AsyncSession = Depends(get_async_db)):
+        if latency_ms:
+            await db.execute(sleep)
+        return {"size": len((await db.scalars(query)).all())}
+
+    return app
+
+
+async def run(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> float:
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get(path)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    app = build_app(args.latency_ms)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm both connection pools before measuring
+        await run(client, "/sync", args.concurrency, args.concurrency)
+        await run(client, "/async", args.concurrency, args.concurrency)
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, "
+              f"added latency {args.latency_ms}ms")
+        for path in ("/sync", "/async"):
+            throughput = await run(client, path, args.requests, args.concurrency)
+            print(f"  {path:<7} {throughput:10.1f} req/s")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Measure login throughput and how much a login burst slows other requests.
+
+Registers a throwaway user, then fires ``--logins`` concurrent logins through
+the real auth router while a probe loop keeps hitting a cheap endpoint.
+Reports logins per second and the probe's median/p95 latency during the
+burst, against the database in DATABASE_URL.
+
+    uv run python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1 import auth
+from app.auth.hashing import password_hasher
+from app.database import async_engine
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/v1")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def main(args: argparse.Namespace) -> None:
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        username = f"bench-{uuid.uuid4().hex[:12]}"
+        credentials = {"username": username, "password": "bench-password"}
+        response = await client.post("/api/v1/auth/register", json={
+            "email": f"{username}@example.com", **credentials
+        })
+        response.raise_for_status()
+
+        remaining = iter(range(args.logins))
+        statuses = []
+        probe_latencies = []
+        burst_done = asyncio.Event()
+
+        async def login_worker():
+            for _ in remaining:
+                statuses.append((await client.post("/api/v1/auth/login", data=credentials)).status_code)
+
+        async def probe():
+            while not burst_done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        burst_done.set()
+        await probe_task
+
+    ok = statuses.count(200)
+    print(f"{args.logins} logins, concurrency {args.concurrency}")
+    print(f"  logins      {ok / elapsed:10.1f} /s  ({ok} ok, {len(statuses) - ok} rejected)")
+    if len(probe_latencies) >= 2:
+        p95 = statistics.quantiles(probe_latencies, n=20)[-1]
+        print(f"  probe p50   {statistics.median(probe_latencies):10.1f} ms")
+        print(f"  probe p95   {p95:10.1f} ms")
+
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,232 @@
+"""Columns and tables added since the baseline, with backfills
+
+Adds recurrence, origin and sync tracking columns, the conflicts, tombstone
+and busy-day tables, and the unique key that upserts rely on. Existing rows
+are backfilled so generated events made by the old code paths are told
+apart from real ones and calendar counters start out correct.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.event_count_service import recount_events
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+event_origin = sa.Enum('NATIVE', 'MASTER_COPY', 'BUSY_BLOCK', name='eventorigin')
+
+calendars = sa.table(
+    "calendars",
+    sa.column("id", sa.Integer),
+    sa.column("is_master", sa.Boolean),
+)
+events = sa.table(
+    "events",
+    sa.column("id", sa.Integer),
+    sa.column("calendar_id", sa.Integer),
+    sa.column("provider_event_id", sa.String),
+    sa.column("origin", event_origin),
+    sa.column("source_event_id", sa.Integer),
+)
+
+# Keeps IN (...) lists well under driver parameter limits
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _dedupe_provider_ids(bind) -> None:
+    """Rename duplicate (calendar_id, provider_event_id) pairs so the unique key can be added.
+
+    The baseline create route accepted duplicates; the oldest row keeps its
+    id and the others get a ``#<event id>`` suffix rather than being dropped.
+    """
+    duplicated = sa.select(events.c.calendar_id, events.c.provider_event_id).group_by(
+        events.c.calendar_id, events.c.provider_event_id
+    ).having(sa.func.count() > 1).subquery()
+    rows = bind.execute(
+        sa.select(events.c.id, events.c.provider_event_id).join(duplicated, sa.and_(
+            events.c.calendar_id == duplicated.c.calendar_id,
+            events.c.provider_event_id == duplicated.c.provider_event_id
+        )).order_by(events.c.calendar_id, events.c.provider_event_id, events.c.id)
+    ).all()
+
+    seen = set()
+    renames = []
+    for row in rows:
+        if row.provider_event_id in seen:
+            renames.append({"event_id": row.id, "renamed": f"{row.provider_event_id}#{row.id}"})
+        seen.add(row.provider_event_id)
+    if renames:
+        bind.execute(
+            events.update().where(events.c.id == sa.bindparam("event_id"))
+            .values(provider_event_id=sa.bindparam("renamed")),
+            renames
+        )
+
+
+def _backfill_origin(bind) -> None:
+    """Mark the master copies (``sync_<id>``) and busy blocks (``busy_<id>``) of the old code paths"""
+    master_ids = {row.id for row in bind.execute(sa.select(calendars.c.id).where(calendars.c.is_master == sa.true()))}
+    rows = bind.execute(
+        sa.select(events.c.id, events.c.calendar_id, events.c.provider_event_id).where(sa.or_(
+            events.c.provider_event_id.startswith("sync_", autoescape=True),
+            events.c.provider_event_id.startswith("busy_", autoescape=True)
+        ))
+    ).all()
+
+    copies = {}
+    busy_blocks = []
+    for row in rows:
+        prefix, _, suffix = row.provider_event_id.partition("_")
+        if prefix == "sync" and row.calendar_id in master_ids:
+            copies[row.id] = int(suffix) if suffix.isdigit() else None
+        elif prefix == "busy" and row.calendar_id not in master_ids:
+            busy_blocks.append(row.id)
+
+    for chunk in _chunks(busy_blocks):
+        bind.execute(events.update().where(events.c.id.in_(chunk)).values(origin="BUSY_BLOCK"))
+    for chunk in _chunks(list(copies)):
+        bind.execute(events.update().where(events.c.id.in_(chunk)).values(origin="MASTER_COPY"))
+
+    # Copies of sources deleted since keep no source; the next full projection sweeps them
+    sources = [source_id for source_id in copies.values() if source_id is not None]
+    live = set()
+    for chunk in _chunks(sources):
+        live.update(bind.execute(sa.select(events.c.id).where(events.c.id.in_(chunk))).scalars())
+    linked = [{"event_id": copy_id, "source": source_id} for copy_id, source_id in copies.items() if source_id in live]
+    if linked:
+        bind.execute(
+            events.update().where(events.c.id == sa.bindparam("event_id"))
+            .values(source_event_id=sa.bindparam("source")),
+            linked
+        )
+
+
+def _backfill_event_counts(bind) -> None:
+    calendar_ids = list(bind.execute(sa.select(calendars.c.id)).scalars())
+    for chunk in _chunks(calendar_ids):
+        bind.execute(recount_events(chunk))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    with op.batch_alter_table('calendars', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('projection_watermark', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('event_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('webhook_channel_id', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('webhook_token', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_calendars_webhook_channel_id'), ['webhook_channel_id'], unique=True)
+
+    # add_column does not create PostgreSQL enum types the way create_table does
+    event_origin.create(bind, checkfirst=True)
+    _dedupe_provider_ids(bind)
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_recurring', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_rule', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('recurring_event_id', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('original_start_time', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('origin', event_origin, server_default='NATIVE', nullable=False))
+        batch_op.add_column(sa.Column('source_event_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_events_source_event_id_events', 'events', ['source_event_id'], ['id'], ondelete='CASCADE'
+        )
+        batch_op.create_unique_constraint('uq_events_calendar_provider_event', ['calendar_id', 'provider_event_id'])
+        batch_op.create_index('ix_events_start_time_id', ['start_time', 'id'], unique=False)
+        batch_op.create_index('ix_events_calendar_start_time_id', ['calendar_id', 'start_time', 'id'], unique=False)
+        batch_op.create_index(
+            'ix_events_busy_blocks', ['calendar_id', 'start_time'], unique=False,
+            postgresql_where=sa.text("origin = 'BUSY_BLOCK'"), sqlite_where=sa.text("origin = 'BUSY_BLOCK'")
+        )
+        batch_op.create_index(
+            'ix_events_source_event_id', ['source_event_id'], unique=False,
+            postgresql_where=sa.text('source_event_id IS NOT NULL'),
+            sqlite_where=sa.text('source_event_id IS NOT NULL')
+        )
+
+    op.create_table('busy_days',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('bitmap', sa.LargeBinary(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_table('event_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('calendar_id', sa.Integer(), nullable=False),
+        sa.Column('provider_event_id', sa.String(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['calendar_id'], ['calendars.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_event_tombstones_calendar_deleted_at', 'event_tombstones', ['calendar_id', 'deleted_at'], unique=False)
+    op.create_index(op.f('ix_event_tombstones_id'), 'event_tombstones', ['id'], unique=False)
+    op.create_table('conflicts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('conflicting_event_id', sa.Integer(), nullable=False),
+        sa.Column('conflict_type', sa.Enum('OVERLAP', 'BACK_TO_BACK', 'TRAVEL_TIME', 'DOUBLE_BOOKING', name='conflicttype'), nullable=False),
+        sa.Column('severity', sa.Enum('LOW', 'MEDIUM', 'HIGH', 'CRITICAL', name='conflictseverity'), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('suggested_resolution', sa.Text(), nullable=True),
+        sa.Column('is_resolved', sa.Boolean(), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.Column('resolution_notes', sa.Text(), nullable=True),
+        sa.Column('overlap_start', sa.DateTime(), nullable=True),
+        sa.Column('overlap_end', sa.DateTime(), nullable=True),
+        sa.Column('overlap_duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['conflicting_event_id'], ['events.id'], ),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'conflicting_event_id', name='uq_conflicts_event_pair')
+    )
+    op.create_index(op.f('ix_conflicts_conflicting_event_id'), 'conflicts', ['conflicting_event_id'], unique=False)
+    op.create_index(op.f('ix_conflicts_event_id'), 'conflicts', ['event_id'], unique=False)
+    op.create_index(op.f('ix_conflicts_id'), 'conflicts', ['id'], unique=False)
+
+    _backfill_origin(bind)
+    _backfill_event_counts(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in ("conflicts", "event_tombstones", "busy_days"):
+        op.drop_table(table)
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_source_event_id')
+        batch_op.drop_index('ix_events_busy_blocks')
+        batch_op.drop_index('ix_events_calendar_start_time_id')
+        batch_op.drop_index('ix_events_start_time_id')
+        batch_op.drop_constraint('uq_events_calendar_provider_event', type_='unique')
+        batch_op.drop_constraint('fk_events_source_event_id_events', type_='foreignkey')
+        for column in ('source_event_id', 'origin', 'original_start_time', 'recurring_event_id', 'recurrence_rule', 'is_recurring'):
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table('calendars', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_calendars_webhook_channel_id'))
+        for column in ('webhook_token', 'webhook_channel_id', 'event_count', 'projection_watermark'):
+            batch_op.drop_column(column)
+
+    # PostgreSQL keeps enum types after their tables and columns are dropped
+    for enum_name in ("conflictseverity", "conflicttype", "eventorigin"):
+        sa.Enum(name=enum_name).drop(bind, checkfirst=True)
@@ -0,0 +1,49 @@
+"""Composite and partial indexes for hot queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = (
+    ("ix_calendars_user_provider_calendar", "calendars", ["user_id", "provider", "provider_calendar_id"], None),
+    ("ix_calendars_master_user", "calendars", ["user_id"], "is_master"),
+    ("ix_events_calendar_end_time", "events", ["calendar_id", "end_time"], None),
+    ("ix_events_calendar_updated_at", "events", ["calendar_id", "updated_at"], None),
+    ("ix_events_series", "events", ["calendar_id", "start_time"], "recurrence_rule IS NOT NULL"),
+    ("ix_events_overrides", "events", ["calendar_id", "original_start_time"], "original_start_time IS NOT NULL"),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the tables writable while the indexes build, but
+    # cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            predicate = sa.text(where) if where else None
+            op.create_index(
+                name, table, columns,
+                postgresql_where=predicate,
+                sqlite_where=predicate,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,39 @@
+"""Generated tsrange of event times with a GiST index
+
+PostgreSQL only; SQLite keeps filtering on start_time/end_time.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Adding a stored generated column rewrites the table under an exclusive lock
+    op.execute(
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS time_range tsrange "
+        "GENERATED ALWAYS AS (tsrange(start_time, GREATEST(start_time, end_time), '[)')) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_events_time_range ON events USING gist (time_range)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_events_time_range")
+    op.execute("ALTER TABLE events DROP COLUMN IF EXISTS time_range")
@@ -0,0 +1,63 @@
+"""Provider ownership of events and settings change times of calendars
+
+``events.from_provider`` marks rows a provider sync created, so full
+listings only sweep those. Existing rows get it when they carry an etag in a
+calendar that has been synced: events created through the API never had one.
+
+``calendars.settings_changed_at`` replaces ``updated_at`` as the signal for
+the master projection to re-project a calendar wholesale, so sync bookkeeping
+no longer looks like a settings change. It starts out as ``updated_at``.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+calendars = sa.table(
+    "calendars",
+    sa.column("id", sa.Integer),
+    sa.column("last_sync_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime),
+    sa.column("settings_changed_at", sa.DateTime),
+)
+events = sa.table(
+    "events",
+    sa.column("calendar_id", sa.Integer),
+    sa.column("origin", sa.String),
+    sa.column("etag", sa.String),
+    sa.column("from_provider", sa.Boolean),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("calendars", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("settings_changed_at", sa.DateTime(), nullable=True))
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("from_provider", sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    op.execute(calendars.update().values(settings_changed_at=calendars.c.updated_at))
+    synced = sa.select(calendars.c.id).where(calendars.c.last_sync_at.isnot(None))
+    op.execute(events.update().where(
+        events.c.calendar_id.in_(synced),
+        events.c.origin == "NATIVE",
+        events.c.etag.isnot(None)
+    ).values(from_provider=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("events", schema=None) as batch_op:
+        batch_op.drop_column("from_provider")
+    with op.batch_alter_table("calendars", schema=None) as batch_op:
+        batch_op.drop_column("settings_changed_at")
@@ -0,0 +1,136 @@
+"""The bulk event upsert through COPY on PostgreSQL.
+
+Runs against a throwaway schema of the database in DATABASE_URL. Skipped
+unless DATABASE_URL points at PostgreSQL, since other databases take the
+executemany path instead.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import ASYNC_SQLALCHEMY_DATABASE_URL
+from app.models.simple import (
+    Base,
+    Calendar as CalendarModel,
+    CalendarProvider,
+    Event as EventModel,
+    EventOrigin,
+    User,
+)
+from app.services.external_sync_service import upsert_events
+from app.services.providers.base import ProviderEvent
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs DATABASE_URL pointing at PostgreSQL"
+)
+
+START = datetime(2026, 3, 2, 9)
+
+
+@pytest.fixture
+async def db():
+    """An async session whose search_path is a fresh schema with the app's tables"""
+    schema = f"upsert_{uuid.uuid4().hex[:8]}"
+    engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+    async with engine.connect() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        await conn.execute(text(f"SET search_path TO {schema}"))
+        try:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.commit()
+            async with AsyncSession(bind=conn, autoflush=False, expire_on_commit=False) as session:
+                yield session
+        finally:
+            await conn.rollback()
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def calendar(db):
+    user = User(email="import@example.com", name="Import")
+    db.add(user)
+    await db.flush()
+    calendar = CalendarModel(
+        user_id=user.id, provider=CalendarProvider.GOOGLE, provider_calendar_id="primary", name="Work"
+    )
+    db.add(calendar)
+    await db.commit()
+    return calendar
+
+
+def _events(count: int, etag: str = "v1", prefix: str = "evt") -> List[ProviderEvent]:
+    return [
+        ProviderEvent(
+            provider_event_id=f"{prefix}{i}",
+            title=f"Event {i}",
+            start_time=START + timedelta(hours=i),
+            end_time=START + timedelta(hours=i, minutes=30),
+            etag=etag,
+        )
+        for i in range(count)
+    ]
+
+
+async def _stored(db: AsyncSession, calendar: CalendarModel):
+    return (await db.scalars(
+        select(EventModel).where(EventModel.calendar_id == calendar.id).order_by(EventModel.provider_event_id)
+    )).all()
+
+
+async def test_copy_upsert_inserts_new_events(db, calendar):
+    counts = await upsert_events(db, calendar, _events(3), bulk=True)
+    await db.commit()
+
+    stored = await _stored(db, calendar)
+    assert sorted(counts.pop("written_ids")) == [event.id for event in stored]
+    assert counts == {"written": 3, "unchanged": 0, "created": 3}
+    assert [event.title for event in stored] == ["Event 0", "Event 1", "Event 2"]
+    # Columns left out of the COPY fall back to their defaults
+    assert {event.origin for event in stored} == {EventOrigin.NATIVE}
+    assert await db.scalar(select(CalendarModel.event_count).where(CalendarModel.id == calendar.id)) == 3
+
+
+async def test_copy_upsert_skips_events_with_an_unchanged_etag(db, calendar):
+    await upsert_events(db, calendar, _events(3), bulk=True)
+    await db.commit()
+
+    changed = _events(3)
+    changed[1].etag = "v2"
+    changed[1].title = "Moved"
+    counts = await upsert_events(db, calendar, changed, bulk=True)
+    await db.commit()
+
+    stored = await _stored(db, calendar)
+    assert counts.pop("written_ids") == [stored[1].id]
+    assert counts == {"written": 1, "unchanged": 2, "created": 0}
+    assert [event.title for event in stored] == ["Event 0", "Moved", "Event 2"]
+
+
+async def test_copy_upsert_stages_each_chunk_of_a_transaction_alone(db, calendar):
+    first = await upsert_events(db, calendar, _events(2, prefix="a"), bulk=True)
+    second = await upsert_events(db, calendar, _events(2, prefix="b"), bulk=True)
+    await db.commit()
+
+    assert first["written"] == second["written"] == 2
+    assert len(await _stored(db, calendar)) == 4
+
+
+async def test_copy_upsert_keeps_provider_ownership(db, calendar):
+    await upsert_events(db, calendar, _events(1), bulk=True, from_provider=True)
+    await db.commit()
+
+    await upsert_events(db, calendar, _events(1, etag="v2"), bulk=True)
+    await db.commit()
+
+    [event] = await _stored(db, calendar)
+    assert event.from_provider is True
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api import events
+from app.database import get_async_db, get_db
+from app.models.simple import Base, Calendar as CalendarModel, CalendarProvider, Event as EventModel, User
+
+START = datetime(2026, 3, 2, 9)
+
+
+@pytest.fixture
+def calendars(tmp_path):
+    """Two calendars of one user, in a SQLite file, holding three and one events"""
+    path = tmp_path / "events.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = User(email="list@example.com", name="List")
+        db.add(user)
+        db.flush()
+        work, home = (
+            CalendarModel(user_id=user.id, provider=CalendarProvider.GOOGLE, provider_calendar_id=name, name=name)
+            for name in ("work", "home")
+        )
+        db.add_all([work, home])
+        db.flush()
+        db.add_all([
+            EventModel(
+                calendar_id=calendar.id, provider_event_id=f"evt{i}", title=f"Event {i}",
+                start_time=START + timedelta(hours=i), end_time=START + timedelta(hours=i, minutes=30)
+            )
+            for i, calendar in enumerate([work, work, work, home])
+        ])
+        db.commit()
+        ids = (work.id, home.id)
+    engine.dispose()
+    yield f"sqlite+aiosqlite:///{path}", ids
+
+
+@pytest.fixture
+def client(calendars):
+    url, _ = calendars
+    engine = create_async_engine(url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    sync_engine = create_engine(url.replace("+aiosqlite", ""), poolclass=NullPool)
+    sync_sessions = sessionmaker(sync_engine, autoflush=False)
+
+    async def get_test_db():
+        async with sessions() as db:
+            yield db
+
+    def get_sync_test_db():
+        with sync_sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(events.router, prefix="/api/v1/events")
+    app.dependency_overrides[get_async_db] = get_test_db
+    app.dependency_overrides[get_db] = get_sync_test_db
+    return TestClient(app)
+
+
+def _series(calendar_id: int, timezone: str) -> dict:
+    return {
+        "calendar_id": calendar_id, "provider_event_id": "standup", "title": "Standup", "timezone": timezone,
+        "start_time": "2026-03-02T08:00:00", "end_time": "2026-03-02T08:15:00",
+        "recurrence_rule": "RRULE:FREQ=DAILY;COUNT=5",
+    }
+
+
+def test_unfiltered_listing_counts_every_event(client):
+    response = client.get("/api/v1/events/", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 4
+    assert response.json()["size"] == 2
+
+
+def test_filtered_listing_counts_matching_events(client, calendars):
+    _, (work_id, home_id) = calendars
+
+    assert client.get("/api/v1/events/", params={"calendar_id": work_id}).json()["total"] == 3
+    assert client.get("/api/v1/events/", params={"calendar_id": home_id}).json()["total"] == 1
+
+
+def test_cursor_pages_leave_the_total_out_unless_asked(client):
+    first = client.get("/api/v1/events/", params={"limit": 2}).json()
+    cursor = first["next_cursor"]
+
+    assert client.get("/api/v1/events/", params={"limit": 2, "cursor": cursor}).json()["total"] is None
+    asked = client.get("/api/v1/events/", params={"limit": 2, "cursor": cursor, "include_total": True}).json()
+    assert asked["total"] == 4
+    assert [event["title"] for event in asked["events"]] == ["Event 2", "Event 3"]
+
+
+def test_a_series_in_an_unknown_zone_is_rejected(client, calendars):
+    _, (work_id, _) = calendars
+
+    response = client.post("/api/v1/events/", json=_series(work_id, "Mars/Olympus"))
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Unknown time zone 'Mars/Olympus'"
+    assert client.get("/api/v1/events/", params={"calendar_id": work_id}).json()["total"] == 3
+
+
+def test_moving_a_series_to_an_unknown_zone_is_rejected(client, calendars):
+    _, (work_id, _) = calendars
+    created = client.post("/api/v1/events/", json=_series(work_id, "Europe/Berlin"))
+    assert created.status_code == 201
+
+    response = client.patch(f"/api/v1/events/{created.json()['id']}", json={"timezone": "Mars/Olympus"})
+
+    assert response.status_code == 422
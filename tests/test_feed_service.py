@@ -0,0 +1,53 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.feed_service import _ics_event, _vtimezone
+
+
+def _series(timezone: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        provider_event_id="sync_1", recurring_event_id=None, original_start_time=None,
+        title="Standup", description=None, location=None, status="confirmed",
+        start_time=datetime(2026, 3, 10, 8), end_time=datetime(2026, 3, 10, 8, 30),
+        timezone=timezone, is_all_day=False, recurrence_rule="RRULE:FREQ=WEEKLY",
+        updated_at=datetime(2026, 3, 1),
+    )
+
+
+def _lines(text: str, prefix: str):
+    return [line for line in text.split("\r\n") if line.startswith(prefix)]
+
+
+def test_series_in_a_zone_are_written_in_its_wall_clock_time():
+    event = _ics_event(_series("Europe/Berlin"))
+
+    assert _lines(event, "DTSTART") == ["DTSTART;TZID=Europe/Berlin:20260310T090000"]
+    assert _lines(event, "DTEND") == ["DTEND;TZID=Europe/Berlin:20260310T093000"]
+
+
+def test_series_in_an_unknown_zone_are_written_in_utc():
+    event = _ics_event(_series("Mars/Olympus"))
+
+    assert _lines(event, "DTSTART") == ["DTSTART:20260310T080000Z"]
+    assert _lines(event, "DTEND") == ["DTEND:20260310T083000Z"]
+
+
+def test_vtimezone_lists_each_offset_change_in_the_years_covered():
+    component = _vtimezone("Europe/Berlin", 2026, 2026)
+
+    assert _lines(component, "TZID") == ["TZID:Europe/Berlin"]
+    # The offset in force on January 1st, then the two changes of 2026
+    assert _lines(component, "DTSTART") == [
+        "DTSTART:20260101T010000", "DTSTART:20260329T020000", "DTSTART:20261025T030000",
+    ]
+    assert _lines(component, "TZOFFSETTO") == ["TZOFFSETTO:+0100", "TZOFFSETTO:+0200", "TZOFFSETTO:+0100"]
+    assert _lines(component, "BEGIN:") == [
+        "BEGIN:VTIMEZONE", "BEGIN:STANDARD", "BEGIN:DAYLIGHT", "BEGIN:STANDARD",
+    ]
+
+
+def test_vtimezone_of_a_zone_without_changes_has_one_observance():
+    component = _vtimezone("Asia/Kolkata", 2026, 2027)
+
+    assert _lines(component, "TZOFFSETFROM") == ["TZOFFSETFROM:+0530"]
+    assert _lines(component, "TZOFFSETTO") == ["TZOFFSETTO:+0530"]
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.providers import http
+from app.services.providers.http import ProviderHTTPClient, parse_retry_after
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays the client asked for; nothing actually waits"""
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(http.asyncio, "sleep", sleep)
+    return delays
+
+
+async def _client(responses) -> ProviderHTTPClient:
+    """A provider client answering from ``responses`` in order, through httpx.MockTransport"""
+    pending = list(responses)
+    client = ProviderHTTPClient("test", "https://provider.test")
+    await client.client.aclose()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        outcome = pending.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client.client = httpx.AsyncClient(base_url="https://provider.test", transport=httpx.MockTransport(handler))
+    return client
+
+
+async def test_retries_429_after_the_delay_the_provider_asks_for(sleeps):
+    client = await _client([
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(200, json={"items": []}),
+    ])
+
+    response = await client.get("/events")
+
+    assert response.status_code == 200
+    assert sleeps == [2.0]
+    assert client.stats.retries == 1
+    assert client.stats.status_counts == {429: 1, 200: 1}
+
+
+async def test_retries_503_with_jittered_exponential_backoff(sleeps, monkeypatch):
+    monkeypatch.setattr(http.random, "uniform", lambda low, high: high)
+    client = await _client([httpx.Response(503)] * 3 + [httpx.Response(200)])
+
+    response = await client.get("/events")
+
+    assert response.status_code == 200
+    base = settings.provider_http_backoff_base_seconds
+    assert sleeps == [base, base * 2, base * 4]
+
+
+async def test_caps_retry_after_at_the_backoff_maximum(sleeps):
+    client = await _client([
+        httpx.Response(503, headers={"Retry-After": "3600"}),
+        httpx.Response(200),
+    ])
+
+    await client.get("/events")
+
+    assert sleeps == [settings.provider_http_backoff_max_seconds]
+
+
+async def test_returns_the_last_response_once_retries_run_out(sleeps):
+    client = await _client([httpx.Response(429)] * (settings.provider_http_max_retries + 1))
+
+    response = await client.get("/events")
+
+    assert response.status_code == 429
+    assert len(sleeps) == settings.provider_http_max_retries
+    assert client.stats.requests == settings.provider_http_max_retries + 1
+
+
+async def test_does_not_retry_other_errors(sleeps):
+    client = await _client([httpx.Response(500)])
+
+    response = await client.get("/events")
+
+    assert response.status_code == 500
+    assert sleeps == []
+
+
+async def test_retries_connection_failures(sleeps):
+    client = await _client([httpx.ConnectError("refused"), httpx.Response(200)])
+
+    response = await client.get("/events")
+
+    assert response.status_code == 200
+    assert len(sleeps) == 1
+    assert client.stats.errors == 1
+
+
+async def test_raises_once_connection_retries_run_out(sleeps):
+    client = await _client([httpx.ConnectError("refused")] * (settings.provider_http_max_retries + 1))
+
+    with pytest.raises(httpx.ConnectError):
+        await client.get("/events")
+    assert client.stats.errors == settings.provider_http_max_retries + 1
+
+
+def test_replaces_and_releases_a_client_from_a_closed_loop(monkeypatch):
+    monkeypatch.setattr(http, "_clients", {})
+
+    async def shared():
+        return http.get_http_client("test", "https://provider.test")
+
+    stale = asyncio.run(shared())
+    dropped = []
+    monkeypatch.setattr(stale, "drop_connections", lambda: dropped.append(stale))
+
+    fresh = asyncio.run(shared())
+
+    assert fresh is not stale
+    assert dropped == [stale]
+    assert asyncio.run(shared()) is not fresh
+
+
+def test_closes_a_client_from_an_idle_loop_when_it_runs_again(monkeypatch):
+    monkeypatch.setattr(http, "_clients", {})
+
+    async def shared():
+        return http.get_http_client("test", "https://provider.test")
+
+    idle = asyncio.new_event_loop()
+    try:
+        stale = idle.run_until_complete(shared())
+        asyncio.run(shared())
+        assert not stale.client.is_closed
+
+        idle.run_until_complete(asyncio.sleep(0))
+        assert stale.client.is_closed
+    finally:
+        idle.close()
+
+
+def test_parse_retry_after_reads_seconds_and_http_dates():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
@@ -0,0 +1,228 @@
+"""The hot queries must not scan a seeded table sequentially on PostgreSQL.
+
+Builds the schema from the models in a throwaway schema of the database in
+DATABASE_URL, seeds it, runs ANALYZE and EXPLAINs each statement the API runs
+on its hot paths, built with the app's own filters. This guards the indexes
+declared on the models and created by the migrations. Skipped unless
+DATABASE_URL points at PostgreSQL.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from sqlalchemy import func, or_, select, text, tuple_
+
+from app.database import engine
+from app.models.simple import (
+    Base,
+    Calendar as CalendarModel,
+    CalendarProvider,
+    Conflict as ConflictModel,
+    Event as EventModel,
+    EventOrigin,
+    EventTombstone as EventTombstoneModel,
+)
+from app.services.recurrence_service import EXPANSION_COLUMNS, event_overlap, window_filter
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs DATABASE_URL pointing at PostgreSQL"
+)
+
+USERS = 2000
+CALENDARS_PER_USER = 4  # a master plus three sources
+EVENTS_PER_CALENDAR = 50
+
+SEEDED_TABLES = {"users", "calendars", "events", "event_tombstones", "conflicts"}
+
+SEED_SQL = (
+    """
+    INSERT INTO users (id, email, name, timezone, is_active, created_at, updated_at)
+    SELECT g, 'user' || g || '@example.com', 'User ' || g, 'UTC', true, now(), now()
+    FROM generate_series(1, :users) g
+    """,
+    # Calendar 0 of every user is its master
+    """
+    INSERT INTO calendars (
+        id, user_id, provider, provider_calendar_id, name, is_primary, is_active, is_master,
+        event_count, created_at, updated_at
+    )
+    SELECT g, (g - 1) / :per_user + 1,
+           (CASE WHEN g % 2 = 0 THEN 'GOOGLE' ELSE 'MICROSOFT' END)::calendarprovider,
+           'cal' || g, 'Calendar ' || g, false, true, (g - 1) % :per_user = 0,
+           0, now(), now()
+    FROM generate_series(1, :users * :per_user) g
+    """,
+    # Mostly single events, with a few busy blocks, series and overrides
+    """
+    INSERT INTO events (
+        id, calendar_id, provider_event_id, title, start_time, end_time, timezone, is_all_day,
+        status, visibility, is_recurring, recurrence_rule, recurring_event_id, original_start_time,
+        origin, etag, created_at, updated_at
+    )
+    SELECT g, c, 'evt' || g, 'Event ' || g, s, s + (30 + (g % 4) * 30) * interval '1 minute',
+           'UTC', false, 'confirmed', 'default',
+           g % 50 = 0, CASE WHEN g % 50 = 0 THEN 'RRULE:FREQ=WEEKLY' END,
+           CASE WHEN g % 50 = 1 THEN 'evt' || (g - 1) END,
+           CASE WHEN g % 50 = 1 THEN s END,
+           (CASE WHEN g % 20 = 2 THEN 'BUSY_BLOCK' ELSE 'NATIVE' END)::eventorigin,
+           md5(g::text), s - interval '30 days', s - interval '30 days' + (g % 1000) * interval '1 minute'
+    FROM (
+        SELECT g, (g - 1) / :per_calendar + 1 AS c,
+               date_trunc('hour', now()) - interval '180 days' + (g * 7919 % 525600) * interval '1 minute' AS s
+        FROM generate_series(1, :users * :per_user * :per_calendar) g
+    ) seeded
+    """,
+    """
+    INSERT INTO event_tombstones (id, event_id, calendar_id, provider_event_id, deleted_at)
+    SELECT g, g, (g - 1) / 10 + 1, 'gone' || g, now() - (g % 10000) * interval '1 minute'
+    FROM generate_series(1, :users * :per_user * 10) g
+    """,
+    """
+    INSERT INTO conflicts (id, event_id, conflicting_event_id, conflict_type, severity, is_resolved)
+    SELECT g, g * 2 - 1, g * 2, 'OVERLAP'::conflicttype, 'MEDIUM'::conflictseverity, false
+    FROM generate_series(1, :users * :per_user * :per_calendar / 20) g
+    """,
+)
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """A connection whose search_path is a freshly seeded and analyzed schema"""
+    schema = f"explain_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        try:
+            Base.metadata.create_all(conn)
+            params = {"users": USERS, "per_user": CALENDARS_PER_USER, "per_calendar": EVENTS_PER_CALENDAR}
+            for sql in SEED_SQL:
+                conn.execute(text(sql), params)
+            conn.commit()
+            conn.execute(text("ANALYZE"))
+
+            user_id = USERS // 2
+            master_id = (user_id - 1) * CALENDARS_PER_USER + 1
+            source_ids = list(range(master_id + 1, master_id + CALENDARS_PER_USER))
+            yield SimpleNamespace(
+                conn=conn,
+                user_id=user_id,
+                calendar_id=source_ids[0],
+                source_ids=source_ids,
+                now=datetime.utcnow().replace(minute=0, second=0, microsecond=0),
+            )
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            conn.commit()
+
+
+def _seq_scans(plan: dict) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in SEEDED_TABLES:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def assert_indexed(conn, stmt) -> None:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    row = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    plan = (row if isinstance(row, list) else json.loads(row))[0]["Plan"]
+    scanned = sorted(set(_seq_scans(plan)))
+    assert not scanned, f"sequential scan on {', '.join(scanned)}"
+
+
+def _user_sources(user_id: int):
+    return select(CalendarModel.id).where(
+        CalendarModel.user_id == user_id,
+        CalendarModel.is_active == True,
+        CalendarModel.is_master == False
+    )
+
+
+def test_events_keyset_page(seeded):
+    assert_indexed(seeded.conn, select(EventModel).where(
+        EventModel.calendar_id == seeded.calendar_id,
+        tuple_(EventModel.start_time, EventModel.id) > (seeded.now, 0)
+    ).order_by(EventModel.start_time, EventModel.id).limit(101))
+
+
+def test_events_list_total(seeded):
+    listing = select(EventModel).where(EventModel.calendar_id == seeded.calendar_id)
+    assert_indexed(seeded.conn, select(func.count()).select_from(listing.subquery()))
+
+
+def test_sync_provider_id_lookup(seeded):
+    assert_indexed(seeded.conn, select(EventModel.provider_event_id, EventModel.etag).where(
+        EventModel.calendar_id == seeded.calendar_id,
+        EventModel.provider_event_id.in_([f"evt{i}" for i in range(1, 200)])
+    ))
+
+
+def test_availability_busy_events(seeded):
+    assert_indexed(seeded.conn, select(*EXPANSION_COLUMNS).where(
+        EventModel.calendar_id.in_(_user_sources(seeded.user_id)),
+        EventModel.origin == EventOrigin.NATIVE,
+        window_filter(seeded.conn, seeded.now, seeded.now + timedelta(days=7))
+    ))
+
+
+def test_conflict_overlaps(seeded):
+    assert_indexed(seeded.conn, select(EventModel.id).where(
+        EventModel.calendar_id.in_(seeded.source_ids),
+        event_overlap(seeded.conn, seeded.now, seeded.now + timedelta(days=7))
+    ))
+
+
+def test_projection_changed_sources(seeded):
+    assert_indexed(seeded.conn, select(EventModel.id).where(
+        EventModel.calendar_id.in_(seeded.source_ids),
+        EventModel.updated_at > seeded.now - timedelta(minutes=5)
+    ))
+
+
+def test_projection_tombstones(seeded):
+    assert_indexed(seeded.conn, select(EventTombstoneModel.event_id).where(
+        EventTombstoneModel.calendar_id.in_(seeded.source_ids),
+        EventTombstoneModel.deleted_at > seeded.now - timedelta(minutes=5)
+    ))
+
+
+def test_stored_busy_blocks(seeded):
+    assert_indexed(seeded.conn, select(EventModel.id).where(
+        EventModel.calendar_id.in_(seeded.source_ids),
+        EventModel.origin == EventOrigin.BUSY_BLOCK
+    ))
+
+
+def test_master_calendar_lookup(seeded):
+    assert_indexed(seeded.conn, select(CalendarModel.id).where(
+        CalendarModel.user_id == seeded.user_id,
+        CalendarModel.is_master == True
+    ))
+
+
+def test_sync_status_counters(seeded):
+    assert_indexed(seeded.conn, select(
+        CalendarModel.id, CalendarModel.event_count, CalendarModel.last_sync_at
+    ).where(CalendarModel.user_id == seeded.user_id))
+
+
+def test_calendar_duplicate_check(seeded):
+    assert_indexed(seeded.conn, select(CalendarModel.id).where(
+        CalendarModel.user_id == seeded.user_id,
+        CalendarModel.provider == CalendarProvider.GOOGLE,
+        CalendarModel.provider_calendar_id == "cal2"
+    ))
+
+
+def test_conflicts_of_an_event(seeded):
+    assert_indexed(seeded.conn, select(ConflictModel.id).where(or_(
+        ConflictModel.event_id == 1001,
+        ConflictModel.conflicting_event_id == 1001
+    )))
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import rate_limit
+from app.middleware.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RedisRateLimitBackend,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Only the limiter's view of time is faked; the event loop keeps the real clock
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+@pytest.fixture
+async def redis_backend():
+    client = fakeredis.aioredis.FakeRedis()
+    yield RedisRateLimitBackend(client=client)
+    await client.aclose()
+
+
+async def test_memory_backend_allows_a_burst_of_calls(clock):
+    backend = MemoryRateLimitBackend()
+
+    results = [await backend.hit("client", calls=3, period=60) for _ in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after == pytest.approx(20)
+
+
+async def test_memory_backend_refills_one_call_per_emission_interval(clock):
+    backend = MemoryRateLimitBackend()
+    for _ in range(3):
+        await backend.hit("client", calls=3, period=60)
+
+    clock.advance(19)
+    assert not (await backend.hit("client", calls=3, period=60)).allowed
+    clock.advance(1)
+    result = await backend.hit("client", calls=3, period=60)
+    assert result.allowed
+    assert result.remaining == 0
+
+    clock.advance(60)
+    assert (await backend.hit("client", calls=3, period=60)).remaining == 2
+
+
+async def test_memory_backend_charges_cost(clock):
+    backend = MemoryRateLimitBackend()
+
+    first = await backend.hit("client", calls=10, period=60, cost=5)
+    second = await backend.hit("client", calls=10, period=60, cost=6)
+
+    assert first.allowed and first.remaining == 5
+    assert not second.allowed
+    assert second.retry_after == pytest.approx(6)
+    # A rejected request costs nothing
+    assert (await backend.hit("client", calls=10, period=60, cost=5)).allowed
+
+
+async def test_memory_backend_keys_are_independent(clock):
+    backend = MemoryRateLimitBackend()
+
+    assert (await backend.hit("a", calls=1, period=60)).allowed
+    assert not (await backend.hit("a", calls=1, period=60)).allowed
+    assert (await backend.hit("b", calls=1, period=60)).allowed
+
+
+async def test_memory_backend_bounds_tracked_keys(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+
+    for key in ("a", "b", "c"):
+        await backend.hit(key, calls=1, period=60)
+
+    assert list(backend.storage) == ["b", "c"]
+
+
+async def test_redis_backend_allows_a_burst_of_calls(redis_backend):
+    results = [await redis_backend.hit("client", calls=3, period=60) for _ in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+    assert 19 < results[3].retry_after <= 20
+    assert 59 < results[3].reset_after <= 60
+
+
+async def test_redis_backend_refills_over_time(redis_backend):
+    for _ in range(2):
+        assert (await redis_backend.hit("client", calls=2, period=0.2)).allowed
+    assert not (await redis_backend.hit("client", calls=2, period=0.2)).allowed
+
+    await asyncio.sleep(0.12)
+    assert (await redis_backend.hit("client", calls=2, period=0.2)).allowed
+
+
+async def test_redis_backend_charges_cost(redis_backend):
+    first = await redis_backend.hit("client", calls=10, period=60, cost=5)
+    second = await redis_backend.hit("client", calls=10, period=60, cost=6)
+
+    assert first.allowed and first.remaining == 5
+    assert not second.allowed
+    assert 5 < second.retry_after <= 6
+
+
+async def test_redis_backend_expires_idle_keys(redis_backend):
+    await redis_backend.hit("client", calls=3, period=60)
+
+    ttl = await redis_backend.client.pttl("kronos:ratelimit:client")
+    assert 0 < ttl <= 20_000
+
+
+class FailingBackend:
+    async def hit(self, key, calls, period, cost=1):
+        raise ConnectionError("limiter store is down")
+
+
+def _client(backend, **options) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, calls=10, period=timedelta(minutes=1), backend=backend, **options)
+
+    @app.get("/api/v1/events/")
+    def list_events():
+        return []
+
+    @app.post("/api/v1/sync/run")
+    def run_sync():
+        return {}
+
+    @app.post("/api/v1/webhooks/google")
+    def webhook():
+        return {}
+
+    return TestClient(app)
+
+
+def test_middleware_sets_limit_headers(clock):
+    client = _client(MemoryRateLimitBackend())
+
+    response = client.get("/api/v1/events/")
+
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit"] == "10"
+    assert response.headers["X-RateLimit-Remaining"] == "9"
+
+
+def test_middleware_rejects_with_retry_after(clock):
+    client = _client(MemoryRateLimitBackend())
+    for _ in range(10):
+        client.get("/api/v1/events/")
+
+    response = client.get("/api/v1/events/")
+
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Rate limit exceeded"}
+    assert response.headers["Retry-After"] == "6"
+
+
+def test_middleware_applies_first_matching_cost_rule(clock):
+    client = _client(
+        MemoryRateLimitBackend(),
+        costs=[("POST", "/api/v1/sync/", 4), ("POST", "/api/v1/", 2)]
+    )
+
+    assert client.post("/api/v1/sync/run").headers["X-RateLimit-Remaining"] == "6"
+    # Rules match on method as well as path
+    assert client.get("/api/v1/events/").headers["X-RateLimit-Remaining"] == "5"
+
+
+def test_middleware_caps_cost_at_the_limit(clock):
+    client = _client(MemoryRateLimitBackend(), costs=[("POST", "/api/v1/sync/", 50)])
+
+    response = client.post("/api/v1/sync/run")
+
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_middleware_skips_exempt_prefixes(clock):
+    client = _client(MemoryRateLimitBackend(), exempt_prefixes=["/api/v1/webhooks/"])
+
+    responses = [client.post("/api/v1/webhooks/google") for _ in range(20)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert "X-RateLimit-Limit" not in responses[-1].headers
+
+
+def test_middleware_fails_open_when_backend_errors():
+    client = _client(FailingBackend())
+
+    response = client.get("/api/v1/events/")
+
+    assert response.status_code == 200
+    assert "X-RateLimit-Limit" not in response.headers
+
+
+def test_middleware_counts_on_the_shared_redis_backend():
+    backend = RedisRateLimitBackend(client=fakeredis.aioredis.FakeRedis())
+    client = _client(backend, costs=[("POST", "/api/v1/sync/", 10)])
+
+    assert client.post("/api/v1/sync/run").status_code == 200
+    assert client.get("/api/v1/events/").status_code == 429
@@ -0,0 +1,35 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import webhooks
+from app.database import get_async_db
+
+
+@pytest.fixture
+def client():
+    """The webhook routes, with no database behind them; rejected payloads never reach it"""
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(webhooks.router, prefix="/api/v1/webhooks")
+    app.dependency_overrides[get_async_db] = no_db
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("payload", [b"not json", b"[]", b'"value"', b'{"value": "x"}', b'{"value": [1]}'])
+def test_microsoft_rejects_payloads_that_are_not_a_notification_collection(client, payload):
+    response = client.post(
+        "/api/v1/webhooks/microsoft", content=payload, headers={"Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid notification payload"
+
+
+def test_microsoft_echoes_the_validation_token(client):
+    response = client.post("/api/v1/webhooks/microsoft", params={"validationToken": "abc"})
+
+    assert response.status_code == 200
+    assert response.text == "abc"